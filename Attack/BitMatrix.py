@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+
+"""Bit-packed matrix modification classes."""
+
+from .Matrix import Matrix
+
+from array import array
+import random
+import sys
+
+
+class BitMatrix(Matrix):
+    """
+    The BitMatrix class storing every matrix row as one integer.
+
+    Row i of a matrix M is stored as the integer with bit j set when
+    M[i][j] is 1, the same bit order as binary_to_int. A vector is stored
+    the same way, so adding two rows is a single XOR.
+
+    Matrices of at least M4RI_SIZE rows are multiplied and inverted with
+    the Method of Four Russians.
+
+    ...
+
+    Attributes
+    ----------
+    M4RI_SIZE : int
+        smallest size where the Method of Four Russians is used
+
+    Methods
+    -------
+    matrix_to_rows(M):
+        convert a list matrix to integer rows
+    rows_to_matrix(R, n):
+        convert integer rows to a list matrix
+    get_identity_rows(n):
+        generate an identity matrix as integer rows
+    rows_mul_vector(x, R):
+        multiplie an integer vector with integer rows
+    rows_tables(R, width):
+        split integer rows into lookup tables
+    rows_mul_vectors(X, R, T, width):
+        multiplie many integer vectors with integer rows
+    matrix_mul_rows_column(X, M):
+        multiplie many [] with [[..]..]
+    rows_mul(A, B):
+        multiplie two matrices in integer rows
+    rows_mul_m4ri(A, B, k):
+        multiplie two matrices using the Method of Four Russians
+    calculate_inverse_rows(R):
+        calculate the inverse of integer rows
+    calculate_inverse_m4ri(R, k):
+        calculate the inverse using the Method of Four Russians
+    calculate_inverse(A_t):
+        calculate the inverse of A using integer rows
+    lanes_typecode(bits):
+        get the smallest array typecode holding bits bits
+    pack_lanes(values, tc):
+        pack values into the lanes of one integer
+    unpack_lanes(lanes, count, tc):
+        unpack values from the lanes of one integer
+    calculate_inverses_rows(Rs):
+        calculate the inverse of a stack of integer rows
+    calculate_inverses(As):
+        calculate the inverse of a stack of matrices
+    random_invertible_rows(n):
+        sample an invertible matrix and its inverse
+    """
+
+    M4RI_SIZE = 32
+
+    def __m4ri_width(self, n):
+        """
+        Get the number of columns per table for size n.
+
+        Parameters
+        ----------
+        n : int
+            the size of the matrix
+
+        Returns
+        -------
+        int
+        """
+        return max(2, n.bit_length()-2)
+
+    def matrix_to_rows(self, M):
+        """
+        Convert a list matrix to integer rows.
+
+        Parameters
+        ----------
+        M : list of list of int
+
+        Returns
+        -------
+        list of int
+            the rows of M
+        """
+        return [self.binary_to_int(row) for row in M]
+
+    def rows_to_matrix(self, R, n=None):
+        """
+        Convert integer rows to a list matrix.
+
+        Parameters
+        ----------
+        R : list of int
+            the rows
+        n : int
+            number of columns, defaults to the number of rows
+
+        Returns
+        -------
+        list of list of int
+        """
+        if n == None:
+            n = len(R)
+        return [self.int_to_binary(row, n) for row in R]
+
+    def get_identity_rows(self, n):
+        """
+        Generate an identity matrix (size nxn) as integer rows.
+
+        Parameters
+        ----------
+        n : int
+            the size in x and y direction
+
+        Returns
+        -------
+        list of int
+        """
+        return [1 << i for i in range(n)]
+
+    def rows_mul_vector(self, x, R):
+        """
+        Multiplicate the vector x with the matrix R.
+
+        Parameters
+        ----------
+        x : int
+            the vector
+        R : list of int
+            the matrix rows
+
+        Returns
+        -------
+        int
+            the product x*R
+        """
+        res = 0
+        i = 0
+        while x:
+            if x & 1:
+                res ^= R[i]
+            x >>= 1
+            i += 1
+        return res
+
+    def rows_tables(self, R, width=8):
+        """
+        Split R into tables of all products of width bits.
+
+        Table t holds, for every value v of bits t*width..t*width+width-1
+        of a vector, the XOR of the rows of R selected by v. The entries
+        are filled in Gray code order so each one costs a single XOR.
+
+        Parameters
+        ----------
+        R : list of int
+            the matrix rows
+        width : int
+            the number of bits each table is indexed by
+
+        Returns
+        -------
+        list of list of int
+        """
+        T = []
+        for s in range(0, len(R), width):
+            rows = R[s:s+width]
+            t = [0 for _ in range(2**len(rows))]
+            g_prev = 0
+            for i in range(1, len(t)):
+                g = i ^ (i >> 1)
+                t[g] = t[g_prev] ^ rows[(i & -i).bit_length()-1]
+                g_prev = g
+            T.append(t)
+        return T
+
+    def rows_mul_vectors(self, X, R, T=None, width=8):
+        """
+        Multiplicate every vector in X with the matrix R.
+
+        The product is looked up width bits at a time, one pass over the
+        batch for every table.
+
+        Parameters
+        ----------
+        X : list of int
+            the vectors, each less than 2**len(R)
+        R : list of int
+            the matrix rows
+        T : list of list of int
+            tables from rows_tables(R, width), built if not given
+        width : int
+            the number of bits each table is indexed by
+
+        Returns
+        -------
+        list of int
+            the products x*R for every x in X
+        """
+        if T == None:
+            T = self.rows_tables(R, width)
+        if len(T) == 0:
+            return [0 for _ in X]
+
+        t = T[0]
+        if len(T) == 1:
+            return [t[x] for x in X]
+
+        mask = 2**width-1
+        res = [t[x & mask] for x in X]
+        for i in range(1, len(T)):
+            t = T[i]
+            shift = i*width
+            res = [r ^ t[(x >> shift) & mask] for r, x in zip(res, X)]
+        return res
+
+    def matrix_mul_rows_column(self, X, M):
+        """
+        Multiplicate every [] in X with the [[..]..] matrix M.
+
+        Parameters
+        ----------
+        X : list of list of int
+        M : list of list of int
+
+        Returns
+        -------
+        list of list of int
+            the matrix products
+        """
+        res = self.rows_mul_vectors([self.binary_to_int(x) for x in X],
+                                    self.matrix_to_rows(M))
+        return [self.int_to_binary(r, len(M)) for r in res]
+
+    def rows_mul(self, A, B):
+        """
+        Multiplicate the matrix A with B.
+
+        Parameters
+        ----------
+        A : list of int
+        B : list of int
+
+        Returns
+        -------
+        list of int
+            the product A*B
+        """
+        if len(B) >= self.M4RI_SIZE:
+            return self.rows_mul_m4ri(A, B)
+        return [self.rows_mul_vector(a, B) for a in A]
+
+    def rows_mul_m4ri(self, A, B, k=None):
+        """
+        Multiplicate the matrix A with B using the Method of Four Russians.
+
+        Parameters
+        ----------
+        A : list of int
+        B : list of int
+        k : int
+            number of rows of B per table
+
+        Returns
+        -------
+        list of int
+            the product A*B
+        """
+        if k == None:
+            k = self.__m4ri_width(len(B))
+        return self.rows_mul_vectors(A, B, width=k)
+
+    def calculate_inverse_rows(self, R):
+        """
+        Calculate the inverse of the integer rows R.
+
+        Parameters
+        ----------
+        R : list of int
+
+        Returns
+        -------
+        list of int or []
+            the inverse of R
+        """
+        n = len(R)
+        if n >= self.M4RI_SIZE:
+            return self.calculate_inverse_m4ri(R)
+
+        A = list(R)
+        I = self.get_identity_rows(n)
+        for i in range(n):
+            bit = 1 << i
+            if not A[i] & bit:
+                for j in range(i+1, n):
+                    if A[j] & bit:
+                        A[i], A[j] = A[j], A[i]
+                        I[i], I[j] = I[j], I[i]
+                        break
+                else:
+                    return []
+            a_i = A[i]
+            I_i = I[i]
+            for j in range(n):
+                if j != i and A[j] & bit:
+                    A[j] ^= a_i
+                    I[j] ^= I_i
+        return I
+
+    def calculate_inverse_m4ri(self, R, k=None):
+        """
+        Calculate the inverse of R using the Method of Four Russians.
+
+        The columns are reduced k at a time. The k pivot rows of a block
+        are reduced against each other, every combination of them is put
+        in a Gray code table and all other rows are cleared in the block
+        with a single lookup each.
+
+        Parameters
+        ----------
+        R : list of int
+        k : int
+            number of columns per block
+
+        Returns
+        -------
+        list of int or []
+            the inverse of R
+        """
+        n = len(R)
+        if k == None:
+            k = self.__m4ri_width(n)
+
+        # Each row holds R in the low n bits and I in the high n bits
+        A = [R[i] | (1 << (n+i)) for i in range(n)]
+        for c in range(0, n, k):
+            kk = min(k, n-c)
+
+            for col in range(c, c+kk):
+                bit = 1 << col
+                for j in range(col, n):
+                    row = A[j]
+                    for p in range(c, col):
+                        if row >> p & 1:
+                            row ^= A[p]
+                    A[j] = row
+                    if row & bit:
+                        break
+                else:
+                    return []
+                A[col], A[j] = A[j], A[col]
+                pivot = A[col]
+                for p in range(c, col):
+                    if A[p] & bit:
+                        A[p] ^= pivot
+
+            mask = 2**kk-1
+            T = self.rows_tables(A[c:c+kk], kk)[0]
+            for j in range(n):
+                if j < c or j >= c+kk:
+                    v = (A[j] >> c) & mask
+                    if v:
+                        A[j] ^= T[v]
+
+        return [a >> n for a in A]
+
+    def calculate_inverse(self, A_t):
+        """
+        Calculate the inverse of A using integer rows.
+
+        Parameters
+        ----------
+        A_t : list of int
+
+        Returns
+        -------
+        list of int or []
+            the inverse of A_t
+        """
+        I = self.calculate_inverse_rows(self.matrix_to_rows(A_t))
+        if I == []:
+            return []
+        return self.rows_to_matrix(I, len(A_t))
+
+    def lanes_typecode(self, bits):
+        """
+        Get the smallest array typecode holding bits bits.
+
+        Parameters
+        ----------
+        bits : int
+
+        Returns
+        -------
+        str or None
+            the typecode, None if no typecode is wide enough
+        """
+        for tc in 'BHIQ':
+            if array(tc).itemsize*8 >= bits:
+                return tc
+        return None
+
+    def pack_lanes(self, values, tc):
+        """
+        Pack values into one integer, one lane of typecode tc per value.
+
+        Value i is stored at bit i*array(tc).itemsize*8, so bitwise
+        operations on packed integers work on every lane at once.
+
+        Parameters
+        ----------
+        values : list of int
+        tc : str
+            the array typecode of a lane
+
+        Returns
+        -------
+        int
+        """
+        return int.from_bytes(array(tc, values).tobytes(), sys.byteorder)
+
+    def unpack_lanes(self, lanes, count, tc):
+        """
+        Unpack count values from the lanes of one integer.
+
+        Parameters
+        ----------
+        lanes : int
+            packed by pack_lanes
+        count : int
+            number of lanes
+        tc : str
+            the array typecode of a lane
+
+        Returns
+        -------
+        list of int
+        """
+        a = array(tc)
+        a.frombytes(lanes.to_bytes(count*a.itemsize, sys.byteorder))
+        return a.tolist()
+
+    def calculate_inverses_rows(self, Rs):
+        """
+        Calculate the inverse of every matrix in a stack of integer rows.
+
+        The stack is sliced into lanes, entry (r, c) of every matrix is
+        packed into one integer with one lane per matrix, so a single
+        elimination runs on all matrices at once. Matrices missing a pivot
+        are marked and left out. Matrices larger than 32x32 are inverted
+        one by one, where the wide lanes no longer pay off.
+
+        Parameters
+        ----------
+        Rs : list of list of int
+            K matrices as integer rows, all of size nxn
+
+        Returns
+        -------
+        tuple of list
+            the invertible mask (list of bool) and the inverses
+            (list of list of int, [] where not invertible)
+        """
+        K = len(Rs)
+        n = len(Rs[0]) if K > 0 else 0
+        tc = self.lanes_typecode(n)
+        if tc == None or n == 0 or n > 32:
+            inverses = [self.calculate_inverse_rows(R) for R in Rs]
+            return [I != [] for I in inverses], inverses
+
+        # Every lane holds one entry of one matrix in its lowest bit
+        ones = self.pack_lanes([1 for _ in range(K)], tc)
+        A = []
+        for r in range(n):
+            row = self.pack_lanes([R[r] for R in Rs], tc)
+            A.append([(row >> c) & ones for c in range(n)])
+        I = [[ones if r == c else 0 for c in range(n)] for r in range(n)]
+
+        singular = 0
+        for c in range(n):
+            A_c = A[c]
+            I_c = I[c]
+
+            # Add rows below to row c in every matrix missing the pivot
+            need = ones & ~A_c[c] & ~singular
+            for r in range(c+1, n):
+                if not need:
+                    break
+                m = need & A[r][c]
+                if m:
+                    A_r = A[r]
+                    I_r = I[r]
+                    for x in range(c, n):
+                        A_c[x] ^= A_r[x] & m
+                    for x in range(n):
+                        I_c[x] ^= I_r[x] & m
+                    need &= ~m
+            singular |= need
+
+            for r in range(n):
+                if r != c:
+                    m = A[r][c]
+                    if m:
+                        A_r = A[r]
+                        I_r = I[r]
+                        for x in range(c, n):
+                            A_r[x] ^= A_c[x] & m
+                        for x in range(n):
+                            I_r[x] ^= I_c[x] & m
+
+        rows = []
+        for r in range(n):
+            row = 0
+            for c in range(n):
+                row |= I[r][c] << c
+            rows.append(self.unpack_lanes(row, K, tc))
+
+        invertible = []
+        inverses = []
+        for s, inv in zip(self.unpack_lanes(singular, K, tc), zip(*rows)):
+            if s:
+                invertible.append(False)
+                inverses.append([])
+            else:
+                invertible.append(True)
+                inverses.append(list(inv))
+        return invertible, inverses
+
+    def calculate_inverses(self, As):
+        """
+        Calculate the inverse of every matrix in a stack.
+
+        Parameters
+        ----------
+        As : list of list of list of int
+            K matrices, all of size nxn
+
+        Returns
+        -------
+        tuple of list
+            the invertible mask (list of bool) and the inverses
+            (list of list of list of int, [] where not invertible)
+        """
+        invertible, inverses = self.calculate_inverses_rows([self.matrix_to_rows(A) for A in As])
+        return invertible, [self.rows_to_matrix(I) if I != [] else [] for I in inverses]
+
+    def random_invertible_rows(self, n):
+        """
+        Sample a uniformly random invertible matrix and its inverse.
+
+        Row i is drawn uniformly outside the span of the rows before it,
+        as a random vector of the span plus a random non-zero vector of
+        the columns without a pivot, so no candidate is ever rejected.
+        The span is kept fully reduced together with how every basis
+        vector is combined from the rows, which gives the inverse.
+
+        Parameters
+        ----------
+        n : int
+            the size in x and y direction
+
+        Returns
+        -------
+        tuple of list of int
+            the matrix rows and the rows of its inverse
+        """
+        R = []
+        # pivot column -> [basis vector, combination of the rows in R]
+        basis = {}
+        for i in range(n):
+            free = [c for c in range(n) if c not in basis]
+
+            s = 0
+            s_comb = 0
+            sel = random.getrandbits(i) if i > 0 else 0
+            for v, comb in basis.values():
+                if sel & 1:
+                    s ^= v
+                    s_comb ^= comb
+                sel >>= 1
+
+            c = 0
+            sel = random.randint(1, 2**len(free)-1)
+            for col in free:
+                if sel & 1:
+                    c |= 1 << col
+                sel >>= 1
+
+            R.append(s ^ c)
+            comb = s_comb ^ (1 << i)
+            bit = c & -c
+            for b in basis.values():
+                if b[0] & bit:
+                    b[0] ^= c
+                    b[1] ^= comb
+            basis[bit.bit_length()-1] = [c, comb]
+
+        return R, [basis[col][1] for col in range(n)]
@@ -2,15 +2,19 @@
 
 """Preform hidden sum attack."""
 
-from .Matrix import Matrix
+from .BitMatrix import BitMatrix
 from .Operations import Operations
 from ToyCipher.ToyCipher import ToyCipher
 
-import copy
+from array import array
+import functools
+import multiprocessing
+import os
 import random
+import time
 
 
-class HiddenSum(Matrix):
+class HiddenSum(BitMatrix):
     """
     A class to preform hidden sum attack.
 
@@ -26,17 +30,35 @@ class HiddenSum(Matrix):
         a ToyCipher class
     key : list of int
         the key used
+    cache : TableCache or None
+        on-disk cache of the ring table and Phi maps
+    key_cache_size : int or None
+        number of keys the M matrices are cached for
+    recovery_stats : dict or None
+        the costs of the last recover_key
 
     Methods
     -------
     __is_attackable():
         check that S and P boxes are attackable
-    check_S_attackability():
+    check_S_attackability(S, N, k, num_of_gamma):
         check S box attackability
-    lambda_check():
+    failing_S_boxes(S, N, k, num_of_gamma):
+        find the S boxes that are not linear in Ring
+    lambda_check(P, exhaustive):
         make sure that lambda are in XOR and Ring
     change_key(key):
         update the M matrix for a new key
+    __key_tuple(key):
+        convert a key to a tuple of int
+    __create_key_state(key, t):
+        create M, M_inv and zero for a key
+    key_state(key):
+        get M, M_inv and zero for a key through the key cache
+    key_cache_info():
+        get the hits and misses of the key cache
+    key_cache_clear():
+        empty the key cache
     lambda_tilde(P):
         generate the lambda tilde matrix from P
     lambda_GL_ring(A_t):
@@ -45,9 +67,25 @@ class HiddenSum(Matrix):
         create the M matrix from ToyCipher class t
     attack(c, key):
         decrypt the cipher c
+    __attack_rows(k):
+        get M_inv as integer rows and zero as an integer for a key
+    attack_table(k):
+        get the message of every cipher for a key
+    attack_many(C, k, table):
+        decrypt many ciphers
+    precompute_keys(keys, processes):
+        calculate M_inv and zero for many keys at once
+    zero_index():
+        get the keys of every zero
+    __solve_model(pairs):
+        solve M and zero from known message and cipher pairs
+    __check_keys(keys, pairs):
+        check keys against known message and cipher pairs
+    recover_key(pairs):
+        find the keys matching known message and cipher pairs
     """
 
-    def __init__(self, N=3, k=1, t=None, key=None):
+    def __init__(self, N=3, k=1, t=None, key=None, cache=None, key_cache_size=4096):
         """
         Init default parameters.
 
@@ -61,6 +99,11 @@ class HiddenSum(Matrix):
             a ToyCipher class
         key : list of int or string
             the key used to encrypt
+        cache : TableCache or None
+            on-disk cache of the ring table and Phi maps
+        key_cache_size : int or None
+            number of keys the M matrices are cached for, the least
+            recently used are dropped first, None for no limit
 
         Raises
         ------
@@ -71,11 +114,18 @@ class HiddenSum(Matrix):
         self.k = k
         self.key = key
         self.t = t
+        self.cache = cache
+        self.__attack_table = None
+        self.__key_tables = None
+        self.__zero_index = None
+        self.recovery_stats = None
+        self.key_cache_size = key_cache_size
+        self.__key_states = functools.lru_cache(maxsize=key_cache_size)(self.__create_key_state)
 
         if t == None:
             return
         else:
-            o = Operations(N=N, k=k)
+            o = Operations(N=N, k=k, cache=cache)
 
         self.tilde, self.tilde_inv = o.phi_map(t.P)
         self.P_tilde = self.lambda_tilde(t.P)
@@ -84,15 +134,13 @@ class HiddenSum(Matrix):
         self.__is_attackable()
 
         if key == None:
-            M, zero = self.create_M([0 for _ in range(N)])
-            M_inv = self.calculate_inverse(M)
+            M, M_inv, zero = self.key_state([0 for _ in range(N)])
             if M_inv == []:
                 raise ValueError("The P and S box combination is not attackable, inverse of M undefined.")
         else:
             if type(key) == str:
                 self.key = [int(i) for i in key]
-            self.M, self.zero = self.create_M(self.key)
-            self.M_inv = self.calculate_inverse(self.M)
+            self.M, self.M_inv, self.zero = self.key_state(self.key)
             if self.M_inv == []:
                 raise ValueError("The P and S box combination is not attackable, inverse of M undefined.")
 
@@ -116,73 +164,135 @@ class HiddenSum(Matrix):
     def check_S_attackability(self, S=None, N=None, k=None, num_of_gamma=None):
         """
         Check S box attackability.
+
+        Parameters
+        ----------
+        S : list of dict
+            the S boxes, defaults to the S boxes of t
+        N : int
+            size of the block
+        k : int
+            size of the modifying matrix of the block
+        num_of_gamma : int
+            number of S boxes the block is split into
+
+        Raises
+        ------
+        ValueError
+            if any S box is not linear in Ring
         """
-        # TODO: Operations have to be configured with the correct N and k for the gamma!
-        if S == None:
-            r = Operations(N=3, k=1) #(N=self.N, k=self.k)
-            for S_i in self.t.S:
-                for x in range(2**int(self.N/self.t.num_of_gamma)):
-                    for y in range(2**int(self.N/self.t.num_of_gamma)):
-                        xry = r.ring(x, y)
-                        f_xry = S_i[xry]
-
-                        fx = S_i[x]
-                        fy = S_i[y]
-                        fx_r_fy = r.ring(fx, fy)
-
-                        if f_xry != fx_r_fy:
-                            raise ValueError("S-box is not vulnerable.")
-        else:
-            r = Operations(N=N, k=k) #(N=self.N, k=self.k)
-            for S_i in S:
-                for x in range(2**int(N/num_of_gamma)):
-                    for y in range(2**int(N/num_of_gamma)):
-                        xry = r.ring(x, y)
-                        f_xry = S_i[xry]
+        failing = self.failing_S_boxes(S, N, k, num_of_gamma)
+        if failing != []:
+            raise ValueError("S-box is not vulnerable, failing S-boxes: {}.".format(failing))
 
-                        fx = S_i[x]
-                        fy = S_i[y]
-                        fx_r_fy = r.ring(fx, fy)
+    def failing_S_boxes(self, S=None, N=None, k=None, num_of_gamma=None):
+        """
+        Find the S boxes that are not linear in Ring.
 
-                        if f_xry != fx_r_fy:
-                            raise ValueError("S-box is not vulnerable.")
+        Ring mixes the bits of every gamma, so the S boxes are checked
+        together as one substitution of the whole block against the Ring
+        of (N, k). The unit vectors generate the block under Ring, so
+        the substitution is linear in Ring exactly when
+        S[x o e_j] == S[x] o S[e_j] for every block x and unit vector e_j.
+        An S box fails when its bits differ in any of those, and the
+        check stops once every S box has failed.
 
-    def lambda_check(self, P=None):
+        Parameters
+        ----------
+        S : list of dict
+            the S boxes, defaults to the S boxes of t
+        N : int
+            size of the block
+        k : int
+            size of the modifying matrix of the block
+        num_of_gamma : int
+            number of S boxes the block is split into
+
+        Returns
+        -------
+        list of int
+            the index of every failing S box
+
+        Raises
+        ------
+        ValueError
+            if N is not dividable with num of gamma
         """
-        Make sure that lambda are in XOR and Ring.
+        if S == None:
+            S = self.t.S
+            num_of_gamma = self.t.num_of_gamma
+        if N == None:
+            N = self.N
+        if k == None:
+            k = self.k
+        if num_of_gamma == None:
+            num_of_gamma = len(S)
+        if N % num_of_gamma != 0:
+            raise ValueError("Num of gamma is not dividable with N.")
+
+        r = Operations(N=N, k=k, table=False, cache=self.cache)
+        length = N//num_of_gamma
+        mask = 2**length-1
+        X = range(2**N)
+        S_X = [0 for _ in X]
+        for i in range(len(S)):
+            S_i = [S[i][x] << i*length for x in range(2**length)]
+            S_X = [s | S_i[(x >> i*length) & mask] for s, x in zip(S_X, X)]
+
+        failing = 0
+        for j in range(N):
+            # S[x o e_j] == S[x] o S[e_j] for every x
+            e = 1 << j
+            for a, b in zip([S_X[y] for y in r.ring_many(X, e)], r.ring_many(S_X, S_X[e])):
+                failing |= a ^ b
+            if all((failing >> i*length) & mask for i in range(len(S))):
+                break
+        return [i for i in range(len(S)) if (failing >> i*length) & mask]
+
+    def lambda_check(self, P=None, exhaustive=False):
         """
+        Make sure that lambda are in XOR and Ring.
 
+        P is linear in XOR since it is a matrix. As x o y = x + y + x.y,
+        P is linear in Ring exactly when (x.y)P = xP.yP, and both sides
+        are bilinear, so it is enough to check every pair of unit vectors.
+
+        Parameters
+        ----------
+        P : list of list of int
+            the lambda to check, defaults to the P box of t
+        exhaustive : bool
+            check every pair (x, y) instead of the unit vectors
+
+        Returns
+        -------
+        bool
+            True if lambda is linear in both XOR and Ring
+        """
         if P == None:
             P = self.t.P
 
-        r = Operations(N=self.N, k=self.k)
-        for x in range(2**self.N):
-            for y in range(2**self.N):
-                # (x + y)\lam = x\lam + y\lam
-                # (x + y)\lam
-                x_p_y = self.int_to_binary(x^y, self.N)
-                x_p_y_l = self.binary_to_int(self.matrix_mul_row_column(x_p_y, P))
-
-                # x\lam + y\lam
-                x_l = self.binary_to_int(self.matrix_mul_row_column(self.int_to_binary(x, self.N), P))
-                y_l = self.binary_to_int(self.matrix_mul_row_column(self.int_to_binary(y, self.N), P))
-                xl_p_yl = x_l^y_l
-
-                if xl_p_yl != x_p_y_l:
-                    return False
-
-                # (x o y)\lam = x\lam o y\lam
-                # (x o y)\lam
-                x_o_y = self.int_to_binary(r.ring(x, y), self.N)
-                x_o_y_l = self.binary_to_int(self.matrix_mul_row_column(x_o_y, P))
-
-                # x\lam o y\lam
-                x_lo = self.binary_to_int(self.matrix_mul_row_column(self.int_to_binary(x, self.N), P))
-                y_lo = self.binary_to_int(self.matrix_mul_row_column(self.int_to_binary(y, self.N), P))
-                xl_o_yl = r.ring(x_lo, y_lo)
-
-                if x_o_y_l != xl_o_yl:
-                    return False
+        if not exhaustive:
+            r = Operations(N=self.N, k=self.k, table=False)
+            rows = self.matrix_to_rows(P)
+            for i in range(self.N):
+                for j in range(i, self.N):
+                    # (e_i . e_j)\lam = e_i\lam . e_j\lam
+                    if self.rows_mul_vector(r.dot(1 << i, 1 << j), rows) != r.dot(rows[i], rows[j]):
+                        return False
+            return True
+
+        r = Operations(N=self.N, k=self.k, cache=self.cache)
+        X = range(2**self.N)
+        L = self.rows_mul_vectors(X, self.matrix_to_rows(P))
+        for x in X:
+            # (x + y)\lam = x\lam + y\lam
+            if [L[x^y] for y in X] != [L[x]^y_l for y_l in L]:
+                return False
+
+            # (x o y)\lam = x\lam o y\lam
+            if [L[x_o_y] for x_o_y in r.ring_many(x, X)] != r.ring_many(L[x], L):
+                return False
         return True
 
     def change_key(self, key):
@@ -206,11 +316,87 @@ class HiddenSum(Matrix):
             self.key = [int(i) for i in key]
         else:
             self.key = key
-        self.M, self.zero = self.create_M(self.key)
-        self.M_inv = self.calculate_inverse(self.M)
+        self.M, self.M_inv, self.zero = self.key_state(self.key)
         if self.M_inv == []:
             raise ValueError("The P and S box combination is not attackable.")
 
+    def __key_tuple(self, key):
+        """
+        Convert a key to a tuple of int.
+
+        Parameters
+        ----------
+        key : list of int, str or int
+
+        Returns
+        -------
+        tuple of int
+        """
+        if type(key) == int:
+            return tuple(self.int_to_binary(key, self.N))
+        return tuple(int(i) for i in key)
+
+    def __create_key_state(self, key, t):
+        """
+        Create M, M_inv and zero for a key.
+
+        Parameters
+        ----------
+        key : tuple of int
+            the key
+        t : Class ToyCipher
+            the cipher M is created from
+
+        Returns
+        -------
+        tuple
+            M, M_inv ([] if M is not invertable) and zero
+        """
+        M, zero = self.create_M(list(key))
+        return M, self.calculate_inverse(M), zero
+
+    def key_state(self, key):
+        """
+        Get M, M_inv and zero for a key through the key cache.
+
+        The cache is keyed by the key and the ToyCipher class t, call
+        key_cache_clear if the boxes of t are changed in place. The
+        returned matrices are shared and must not be modified.
+
+        Parameters
+        ----------
+        key : list of int, str or int
+
+        Returns
+        -------
+        tuple
+            M, M_inv ([] if M is not invertable) and zero
+        """
+        return self.__key_states(self.__key_tuple(key), self.t)
+
+    def key_cache_info(self):
+        """
+        Get the hits and misses of the key cache.
+
+        Returns
+        -------
+        named tuple
+            hits, misses, maxsize and currsize of the cache
+        """
+        return self.__key_states.cache_info()
+
+    def key_cache_clear(self):
+        """
+        Empty the key cache.
+
+        Returns
+        -------
+        None
+        """
+        self.__key_states.cache_clear()
+        self.__attack_table = None
+        self.__key_tables = None
+
     def lambda_tilde(self, P):
         """
         Generate the lambda tilde matrix from P.
@@ -234,6 +420,9 @@ class HiddenSum(Matrix):
         """
         Calculate that GL_\circ of A is true.
 
+        The elimination runs in place on integer rows, adding rows with
+        Ring instead of XOR.
+
         Parameters
         ----------
         A_t : list of int
@@ -243,59 +432,31 @@ class HiddenSum(Matrix):
         list of int
             the inverse of A_t
         """
-        r = Operations(N=self.N, k=self.k)
-        A = copy.deepcopy(A_t)
-        I = self.get_identity(len(A))
-        foundPivot = False
+        r = Operations(N=self.N, k=self.k, cache=self.cache)
+        A = self.matrix_to_rows(A_t)
+        I = self.get_identity_rows(len(A))
         for i in range(len(A)):
-            if A[i][i] != 1:
+            bit = 1 << i
+            if not A[i] & bit:
                 for j in range(i+1, len(A)):
-                    if A[j][i] == 1:
-                        foundPivot = True
-                        A = self.row_shift(A, i, j)
-                        I = self.row_shift(I, i, j)
+                    if A[j] & bit:
+                        A[i], A[j] = A[j], A[i]
+                        I[i], I[j] = I[j], I[i]
                         break
-                if foundPivot == False:
-                    return []
                 else:
-                    foundPivot = False
+                    return []
             for j in range(i+1, len(A)):
-                if A[j][i] == 1:
-                    A_t = copy.deepcopy(A)
-                    A_t[j] = self.int_to_binary(
-                                r.ring(self.binary_to_int(A_t[j]),
-                                          self.binary_to_int(A_t[i])),
-                                          self.N
-                                )
-                    A = A_t
-
-                    I_t = copy.deepcopy(I)
-                    I_t[j] = self.int_to_binary(
-                                r.ring(self.binary_to_int(I_t[j]),
-                                          self.binary_to_int(I_t[i])),
-                                          self.N
-                                )
-                    I = I_t
+                if A[j] & bit:
+                    A[j] = r.ring(A[j], A[i])
+                    I[j] = r.ring(I[j], I[i])
 
         for i in range(len(A)-1, 0, -1):
+            bit = 1 << i
             for j in range(i-1, -1, -1):
-                if A[j][i] == 1:
-                    A_t = copy.deepcopy(A)
-                    A_t[j] = self.int_to_binary(
-                                r.ring(self.binary_to_int(A_t[j]),
-                                       self.binary_to_int(A_t[i])),
-                                       self.N
-                                )
-                    A = A_t
-
-                    I_t = copy.deepcopy(I)
-                    I_t[j] = self.int_to_binary(
-                                r.ring(self.binary_to_int(I_t[j]),
-                                       self.binary_to_int(I_t[i])),
-                                       self.N
-                                )
-                    I = I_t
-        return I
+                if A[j] & bit:
+                    A[j] = r.ring(A[j], A[i])
+                    I[j] = r.ring(I[j], I[i])
+        return self.rows_to_matrix(I, self.N)
 
     def create_M(self, key):
         """
@@ -351,20 +512,11 @@ class HiddenSum(Matrix):
             c = self.int_to_binary(c, self.N)
         if type(c) == str:
             c = [int(i) for i in c]
-        if type(k) == int:
-            k = self.int_to_binary(k, self.N)
-        if type(k) == str:
-            k = [int(i) for i in k]
 
         if k != None:
-            M, zero = self.create_M(k)
-            M_inv = self.calculate_inverse(M)
-            if M_inv == []:
-                raise ValueError("M is not invertable.")
-            c_tilde = self.int_to_binary(self.tilde[self.binary_to_int(c)], self.N)
-            c_t = self.xor(c_tilde, zero)
-            m_tilde = self.matrix_mul_row_column(c_t, M_inv)
-            m = self.tilde_inv[self.binary_to_int(m_tilde)]
+            _, R, zero = self.__attack_rows(k)
+            m_tilde = self.rows_mul_vector(self.tilde[self.binary_to_int(c)] ^ zero, R)
+            m = self.tilde_inv[m_tilde]
         elif self.key != None:
             c_tilde = self.int_to_binary(self.tilde[self.binary_to_int(c)], self.N)
             c_t = self.xor(c_tilde, self.zero)
@@ -374,3 +526,350 @@ class HiddenSum(Matrix):
             raise ValueError("No key defined.")
 
         return m
+
+    def __attack_rows(self, k=None):
+        """
+        Get M_inv as integer rows and zero as an integer for a key.
+
+        Parameters
+        ----------
+        k : list of int, str or int
+            the key, defaults to the key of the class
+
+        Returns
+        -------
+        tuple
+            the key as a tuple, the rows of M_inv and zero
+
+        Raises
+        ------
+        ValueError
+            When a key is neither provided to the function
+            nor the class.
+        """
+        if k != None:
+            k = self.__key_tuple(k)
+            c = self.__key_tables
+            if c != None and c[0] is self.t and c[1] is self.tilde:
+                i = self.binary_to_int(k)
+                if c[2][i] == 1:
+                    return k, c[4][i*self.N:(i+1)*self.N].tolist(), c[3][i]
+                if c[2][i] == 2:
+                    raise ValueError("M is not invertable.")
+            M, M_inv, zero = self.key_state(k)
+            if M_inv == []:
+                raise ValueError("M is not invertable.")
+        elif self.key != None:
+            k, M_inv, zero = self.key, self.M_inv, self.zero
+        else:
+            raise ValueError("No key defined.")
+
+        return tuple(k), self.matrix_to_rows(M_inv), self.binary_to_int(zero)
+
+    def attack_table(self, k=None):
+        """
+        Get the message of every cipher for a key.
+
+        Decrypting with a known M_inv and zero is a fixed permutation of
+        the 2^N blocks, so it is calculated once for all of them. The
+        table of the last key is kept.
+
+        Parameters
+        ----------
+        k : list of int, str or int
+            the key, defaults to the key of the class
+
+        Returns
+        -------
+        array of int
+            the message of cipher c at index c
+        """
+        key, R, zero = self.__attack_rows(k)
+        c = self.__attack_table
+        if c != None and c[0] == key and c[1] is self.tilde:
+            return c[2]
+
+        tilde_c = [c_tilde ^ zero for c_tilde in self.tilde]
+        T = array(self.lanes_typecode(self.N) or 'Q',
+                  [self.tilde_inv[m_tilde] for m_tilde in self.rows_mul_vectors(tilde_c, R)])
+        self.__attack_table = (key, self.tilde, T)
+        return T
+
+    def attack_many(self, C, k=None, table=None):
+        """
+        Decrypt many ciphers.
+
+        Parameters
+        ----------
+        C : list of int, array of int or list of list of int
+            the ciphers, as integers or binary lists
+        k : list of int, str or int
+            the key, defaults to the key of the class
+        table : bool or None
+            look the messages up in attack_table, None to do so when
+            there are at least 2^N ciphers
+
+        Returns
+        -------
+        list of int
+
+        Raises
+        ------
+        ValueError
+            When a key is neither provided to the function
+            nor the class.
+        """
+        if len(C) > 0 and type(C[0]) != int:
+            C = [self.binary_to_int(c) for c in C]
+
+        if table == None:
+            table = len(C) >= 2**self.N
+        if table:
+            T = self.attack_table(k)
+            return [T[c] for c in C]
+
+        _, R, zero = self.__attack_rows(k)
+        tilde_c = [self.tilde[c] ^ zero for c in C]
+        return [self.tilde_inv[m_tilde] for m_tilde in self.rows_mul_vectors(tilde_c, R)]
+
+    def precompute_keys(self, keys=None, processes=None):
+        """
+        Calculate M_inv and zero for many keys at once.
+
+        The keys are split over a pool of processes. A chunk of keys
+        encrypts zero and the unit vectors as one batch through the
+        integer tables of the cipher, and the M of the chunk are inverted
+        together. The results are stored in
+        arrays indexed by key, which attack and attack_many look up before
+        calculating M for a key.
+
+        Parameters
+        ----------
+        keys : iterable of int
+            the keys, defaults to all 2^N keys
+        processes : int or None
+            number of processes, 1 to run in this process and None for
+            one per CPU
+
+        Returns
+        -------
+        int
+            the number of keys where M is invertable
+        """
+        if keys == None:
+            keys = range(2**self.N)
+        keys = list(keys)
+        if processes == None:
+            processes = os.cpu_count() or 1
+
+        c = self.__key_tables
+        if c == None or c[0] is not self.t or c[1] is not self.tilde:
+            tc = self.lanes_typecode(self.N) or 'Q'
+            c = (self.t, self.tilde, bytearray(2**self.N),
+                 array(tc, bytes(2**self.N*array(tc).itemsize)),
+                 array(tc, bytes(2**self.N*self.N*array(tc).itemsize)))
+            self.__key_tables = c
+
+        size = max(1, -(-len(keys)//(4*processes)))
+        chunks = [(self.t, self.tilde, keys[i:i+size]) for i in range(0, len(keys), size)]
+        if processes == 1 or len(chunks) <= 1:
+            results = map(_key_states_worker, chunks)
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(_key_states_worker, chunks)
+
+        invertible = 0
+        for (_, _, chunk), (zeros, mask, inverses) in zip(chunks, results):
+            for key, zero, ok, R in zip(chunk, zeros, mask, inverses):
+                c[3][key] = zero
+                if ok:
+                    c[2][key] = 1
+                    c[4][key*self.N:(key+1)*self.N] = array(c[4].typecode, R)
+                    invertible += 1
+                else:
+                    c[2][key] = 2
+        return invertible
+
+    def zero_index(self):
+        """
+        Get the keys of every zero.
+
+        zero is the Phi map of the encrypted zero block, so it is known
+        from M and a single message and cipher pair. The index is a one-off
+        precomputation per cipher: it reuses the zeros of precompute_keys
+        when those cover every key, and otherwise encrypts the zero block
+        under all 2^N keys, which costs as much as one exhaustive sweep.
+
+        Returns
+        -------
+        dict
+            zero as an integer to the list of keys (int) giving it
+        """
+        c = self.__zero_index
+        if c != None and c[0] is self.t and c[1] is self.tilde:
+            return c[2]
+
+        t = self.__key_tables
+        if t != None and t[0] is self.t and t[1] is self.tilde and 0 not in t[2]:
+            zeros = t[3]
+            encryptions = 0
+        else:
+            zeros = [self.tilde[e[0]] for e in self.t.encrypt_many_keys([0], range(2**self.N))]
+            encryptions = 2**self.N
+
+        index = {}
+        for key, zero in enumerate(zeros):
+            index.setdefault(zero, []).append(key)
+        self.__zero_index = (self.t, self.tilde, index, encryptions)
+        return index
+
+    def __solve_model(self, pairs):
+        """
+        Solve M and zero from known message and cipher pairs.
+
+        For the key in use tilde(c) = tilde(m)M + zero, so the differences
+        of N+1 pairs with affinely independent tilde(m) give M.
+
+        Parameters
+        ----------
+        pairs : list of tuple of int
+            the message and cipher pairs
+
+        Returns
+        -------
+        tuple or None
+            M as integer rows and zero, None if the pairs are too few
+        """
+        m_0, c_0 = pairs[0]
+        m_tilde, c_tilde = self.tilde[m_0], self.tilde[c_0]
+        D = []
+        E = []
+        basis = {}
+        for m, c in pairs[1:]:
+            d = self.tilde[m] ^ m_tilde
+            r = d
+            while r and r.bit_length() in basis:
+                r ^= basis[r.bit_length()]
+            if r == 0:
+                continue
+            basis[r.bit_length()] = r
+            D.append(d)
+            E.append(self.tilde[c] ^ c_tilde)
+            if len(D) == self.N:
+                break
+
+        if len(D) < self.N:
+            return None
+        M = self.rows_mul(self.calculate_inverse_rows(D), E)
+        return M, c_tilde ^ self.rows_mul_vector(m_tilde, M)
+
+    def __check_keys(self, keys, pairs):
+        """
+        Check keys against known message and cipher pairs.
+
+        The first pair is encrypted under every key as one batch, the
+        other pairs only under the keys it leaves.
+
+        Parameters
+        ----------
+        keys : list of int
+        pairs : list of tuple of int
+            the message and cipher pairs
+
+        Returns
+        -------
+        tuple
+            the keys matching every pair and the number of encrypted blocks
+        """
+        m, c = pairs[0]
+        encryptions = len(keys)
+        keys = [key for key, e in zip(keys, self.t.encrypt_many_keys([m], keys)) if e[0] == c]
+        if len(pairs) > 1 and keys != []:
+            encryptions += len(keys)*(len(pairs)-1)
+            ciphers = [c for _, c in pairs[1:]]
+            E = self.t.encrypt_many_keys([m for m, _ in pairs[1:]], keys)
+            keys = [key for key, e in zip(keys, E) if e == ciphers]
+        return keys, encryptions
+    def recover_key(self, pairs):
+        """
+        Find the keys matching known message and cipher pairs.
+
+        M and zero are solved from the pairs, the keys giving that zero
+        are looked up in zero_index and checked against every pair. If
+        the pairs are too few to solve M, or no key of the index matches,
+        every key is checked instead. The costs are stored in
+        recovery_stats, the encryptions of a zero_index built by this
+        call included and also given as index_encryptions.
+
+        Parameters
+        ----------
+        pairs : list of tuple
+            the message and cipher pairs, as integers, binary lists or
+            strings
+
+        Returns
+        -------
+        list of list of int
+            every key encrypting all messages to their cipher
+
+        Raises
+        ------
+        ValueError
+            if no pairs are given
+        """
+        if len(pairs) == 0:
+            raise ValueError("No message and cipher pairs given.")
+        start = time.perf_counter()
+        pairs = [tuple(x if type(x) == int else self.binary_to_int(x) for x in p) for p in pairs]
+        stats = {'pairs': len(pairs), 'method': 'model', 'candidates': 0, 'encryptions': 0}
+
+        keys = []
+        model = self.__solve_model(pairs)
+        if model != None:
+            index = time.perf_counter()
+            built = self.__zero_index
+            candidates = self.zero_index().get(model[1], [])
+            stats['index_time'] = time.perf_counter() - index
+            stats['index_encryptions'] = 0
+            if self.__zero_index is not built:
+                stats['index_encryptions'] = self.__zero_index[3]
+                stats['encryptions'] += self.__zero_index[3]
+            keys, n = self.__check_keys(candidates, pairs)
+            stats['encryptions'] += n
+            stats['candidates'] = len(candidates)
+
+        if keys == []:
+            stats['method'] = 'sweep'
+            stats['candidates'] = 2**self.N
+            keys, n = self.__check_keys(list(range(2**self.N)), pairs)
+            stats['encryptions'] += n
+
+        stats['time'] = time.perf_counter() - start
+        self.recovery_stats = stats
+        return [self.int_to_binary(key, self.N) for key in keys]
+
+
+def _key_states_worker(args):
+    """
+    Calculate M_inv and zero for a chunk of keys.
+
+    Parameters
+    ----------
+    args : tuple
+        the ToyCipher class, the Phi map and the keys
+
+    Returns
+    -------
+    tuple
+        zero of every key, the invertible mask and M_inv as integer rows
+    """
+    t, tilde, keys = args
+    blocks = [0] + t.get_identity_rows(t.block_len)
+    zeros = []
+    Ms = []
+    for C in t.encrypt_many_keys(blocks, keys):
+        zero = tilde[C[0]]
+        zeros.append(zero)
+        Ms.append([tilde[c] ^ zero for c in C[1:]])
+    mask, inverses = t.calculate_inverses_rows(Ms)
+    return zeros, mask, inverses
@@ -5,6 +5,16 @@
 import copy
 
 
+# Widths up to this many bits are converted through cached tables
+TABLE_BITS = 12
+
+_binary_tables = {}
+_int_tables = {}
+
+_TO_BITS = bytes.maketrans(b'01', b'\x00\x01')
+_TO_CHARS = bytes.maketrans(b'\x00\x01', b'01')
+
+
 class Matrix:
     """
     The Matrix class containing functions to modify matrices.
@@ -17,10 +27,18 @@ class Matrix:
 
     Methods
     -------
+    __binary_table(l):
+        get the cached binaries of length l
+    __int_table(l):
+        get the cached integers of binaries of length l
     int_to_binary(i, l):
         convert an integer to binary
     binary_to_int(b):
         convert a binary to an integer
+    ints_to_binary(I, l):
+        convert many integers to binary
+    binaries_to_int(B):
+        convert many binaries to integers
     matrix_sum(a, b):
         sum two matrices
     get_identity(n):
@@ -37,6 +55,42 @@ class Matrix:
         xor two lists togother
     """
 
+    def __binary_table(self, l):
+        """
+        Get the binary of every integer less than 2**l.
+
+        Parameters
+        ----------
+        l : int
+            length of the binaries
+
+        Returns
+        -------
+        list of tuple of int
+        """
+        if l not in _binary_tables:
+            fmt = '0{}b'.format(l)
+            _binary_tables[l] = [tuple(format(i, fmt)[::-1].encode().translate(_TO_BITS))[:l]
+                                 for i in range(2**l)]
+        return _binary_tables[l]
+
+    def __int_table(self, l):
+        """
+        Get the integer of every binary of length l.
+
+        Parameters
+        ----------
+        l : int
+            length of the binaries
+
+        Returns
+        -------
+        dict of tuple of int to int
+        """
+        if l not in _int_tables:
+            _int_tables[l] = {b: i for i, b in enumerate(self.__binary_table(l))}
+        return _int_tables[l]
+
     def int_to_binary(self, i, l):
         """
         Convert an integer to binary.
@@ -45,7 +99,7 @@ class Matrix:
         ----------
         i : int
             the integer to convert
-        tot_num_of_bits : int
+        l : int
             total length of the binary
 
         Returns
@@ -53,10 +107,18 @@ class Matrix:
         list of int
             the converted integer
         """
-        b = []
-        while i != 0:
-            b.append(i % 2)
-            i = int(i/2)
+        if i >= 0:
+            if l <= TABLE_BITS and i < 2**l:
+                return list(self.__binary_table(l)[i])
+            if i == 0:
+                return [0 for _ in range(l)]
+            b = list(format(i, 'b').encode().translate(_TO_BITS))
+            b.reverse()
+        else:
+            b = []
+            while i != 0:
+                b.append(i % 2)
+                i = -(-i // 2)
         while(len(b) < l):
             b.append(0)
         return b
@@ -75,15 +137,61 @@ class Matrix:
         int
         """
         if type(b) == str:
+            if b.strip('01') == '':
+                return int(b[::-1] or '0', 2)
             b = [int(i) for i in b]
+        if type(b) == list or type(b) == tuple:
+            try:
+                if len(b) <= TABLE_BITS:
+                    return self.__int_table(len(b))[tuple(b)]
+                s = bytes(b)
+                if s.strip(b'\x00\x01') == b'':
+                    return int(s[::-1].translate(_TO_CHARS), 2)
+            except (KeyError, TypeError, ValueError):
+                pass
         i = 0
         p = 0
         for j in b:
             if j == 1:
-                i += 2**p
+                i |= 1 << p
             p += 1
         return i
 
+    def ints_to_binary(self, I, l):
+        """
+        Convert many integers to binary.
+
+        Parameters
+        ----------
+        I : list of int
+            the integers to convert
+        l : int
+            total length of every binary
+
+        Returns
+        -------
+        list of list of int
+        """
+        if l <= TABLE_BITS and all(0 <= i < 2**l for i in I):
+            table = self.__binary_table(l)
+            return [list(table[i]) for i in I]
+        return [self.int_to_binary(i, l) for i in I]
+
+    def binaries_to_int(self, B):
+        """
+        Convert many binaries to integers.
+
+        Parameters
+        ----------
+        B : list of list of int
+            the binaries to convert
+
+        Returns
+        -------
+        list of int
+        """
+        return [self.binary_to_int(b) for b in B]
+
     def matrix_sum(self, a, b):
         """
         Sum two matrices.
@@ -2,12 +2,22 @@
 
 """Preform special operations."""
 
-from .Matrix import Matrix
+from .BitMatrix import BitMatrix
 
+from array import array
 import copy
+import hashlib
+import random
 
 
-class Operations(Matrix):
+# Ring tables shared by every Operations with the same (N, k)
+_ring_tables = {}
+
+# Dot product structures shared by every Operations with the same (N, k)
+_dot_structures = {}
+
+
+class Operations(BitMatrix):
     """
     A class with operations.
 
@@ -19,6 +29,10 @@ class Operations(Matrix):
         size of the matrix in x and y direction
     k : int
         size of the modifying matrix in x direction
+    cache : TableCache or None
+        on-disk cache of the ring table and Phi maps
+    TABLE_MAX_N : int
+        largest N where the ring table is built by default
 
     Methods
     -------
@@ -26,23 +40,71 @@ class Operations(Matrix):
         generate Bex matrices
     __generate_Bo(N, k):
         generate Bo matrix
+    __generate_Bex_masks():
+        generate the Bex matrices as bitmasks
+    __ring_offset(a, b):
+        calculate a o b + a + b using the Bex bitmasks
     phi_pos_a(a, P_a):
         determine Phi val at pos a substitution using ring
     phi_pos_a_xor(a, P_a):
         determine Phi val at pos a substitution using xor
     phi_map(P):
         calculate the Phi and Phi inverse map
+    __calculate_phi_map(P):
+        calculate the Phi and Phi inverse map without the cache
+    __kernel_rows(R):
+        get a basis of the combinations of rows adding to zero
+    __random_span(V):
+        get a random vector of the span of V
+    __parity(x):
+        get the parity of the set bits of x
+    __form_masks(F, x):
+        get the bits of x.y as functionals of y
+    __dot_structure():
+        get the dot product on a complement of its radical
+    __adjoint_rows(D, Q):
+        get a basis of the adjoint maps of the dot product with multiplier Q
+    __similitude_multipliers(F):
+        get the maps of the image that may multiply a similitude
+    __restrict(X_0, V, mask, bit):
+        restrict an affine space of maps to one linear equation
+    __row_space(F, QD, X_0, V, S):
+        get the candidates of the next row of a similitude
+    __fix_row(F, X_0, V, S, x):
+        fix the next row of a similitude to x
+    __complete_similitude(F, QD, X_0, V, S):
+        complete the first rows of a similitude
+    __random_isometry(F, D, isometries):
+        get a uniformly random isometry of the dot product on C
+    __random_symplectic_basis(F):
+        get a uniformly random symplectic basis of C
+    random_linear_rows():
+        get a random matrix linear in XOR and Ring and its inverse
     get_Bx(b):
         get the Bx matrix
+    ring_table():
+        get the table of every ring product
     ring(a, b):
         preform the ring operation
     dot(a, b):
         preform the dot product
+    __ring_offset_many(A, B):
+        calculate a o b + a + b elementwise over lists
+    ring_many(A, B):
+        preform the ring operation elementwise over lists
+    dot_many(A, B):
+        preform the dot product elementwise over lists
+    ring_outer(A, B):
+        preform the ring operation on every pair of A and B
+    dot_outer(A, B):
+        preform the dot product on every pair of A and B
     matrix_mul_row_ring(M, x, y):
         matrix multiplication using ring
     """
 
-    def __init__(self, N=3, k=1):
+    TABLE_MAX_N = 8
+
+    def __init__(self, N=3, k=1, table=None, cache=None):
         """
         Init default parameters.
 
@@ -52,11 +114,21 @@ class Operations(Matrix):
             size of the matrix in x and y direction
         k : int
             size of the modifying matrix in x direction
+        table : bool or None
+            look up ring in a precomputed table, None to use a table
+            when N is at most TABLE_MAX_N
+        cache : TableCache or None
+            on-disk cache of the ring table and Phi maps
         """
         self.N = N
         self.k = k
+        self.cache = cache
         self.Bo = self.__generate_Bo(N, k)
         self.Bex = self.__generate_Bex()
+        self.Bex_masks = self.__generate_Bex_masks()
+        if table == None:
+            table = N <= self.TABLE_MAX_N
+        self.table = self.ring_table() if table else None
         super().__init__()
 
     def __generate_Bex(self):
@@ -114,6 +186,67 @@ class Operations(Matrix):
             alpha -= 1
         return Bo
 
+    def __generate_Bex_masks(self):
+        """
+        Generate the B_ex matrices as bitmasks.
+
+        Row r of B_ex i is stored in bits k*r..k*r+k-1 of mask i, so
+        summing B_ex matrices is a single XOR.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        list of int
+            one mask for every B_ex matrix
+        """
+        masks = []
+        for Bex_i in self.Bex:
+            m = 0
+            for r in range(len(Bex_i)):
+                m |= self.binary_to_int(Bex_i[r][:self.k]) << (self.k*r)
+            masks.append(m)
+        return masks
+
+    def __ring_offset(self, a, b):
+        """
+        Calculate a o b + a + b using the Bex bitmasks.
+
+        The offset is the product of a with the last k columns of B_b,
+        without building B_b.
+
+        Parameters
+        ----------
+        a : int
+        b : int
+
+        Returns
+        -------
+        int
+            a o b + a + b
+        """
+        n = len(self.Bex_masks)
+        Bx = 0
+        i = 0
+        b &= 2**n-1
+        while b:
+            if b & 1:
+                Bx ^= self.Bex_masks[i]
+            b >>= 1
+            i += 1
+
+        mask = 2**self.k-1
+        offset = 0
+        a &= 2**n-1
+        while a and Bx:
+            if a & 1:
+                offset ^= Bx & mask
+            Bx >>= self.k
+            a >>= 1
+        return offset << (self.N-self.k)
+
     def phi_pos_a(self, a, P_a):
         """
         Calculate Phi for indent a using ring.
@@ -178,31 +311,625 @@ class Operations(Matrix):
         tuple of list of int
             Phi and Phi inverse
         """
-        r = []
-        x = []
-        phi     = {i: i for i in range(2**self.N)}
-        phi_inv = [i for i in range(2**self.N)]
+        if self.cache != None:
+            tc = self.lanes_typecode(self.N)
+            P_hash = hashlib.sha1(repr(self.matrix_to_rows(P)).encode()).hexdigest()
+            name = 'phi_N{}_k{}_{}'.format(self.N, self.k, P_hash)
+            T = self.cache.load(name, tc)
+            if T != None:
+                return T[:2**self.N].tolist(), T[2**self.N:].tolist()
+
+        phi, phi_inv = self.__calculate_phi_map(P)
+        if self.cache != None:
+            self.cache.store(name, phi+phi_inv, tc)
+        return phi, phi_inv
 
-        for i in range(2**self.N):
-            ring = self.phi_pos_a(i, P)
-            xor = self.phi_pos_a_xor(i, P)
-            r.append(ring)
-            x.append(xor)
+    def __calculate_phi_map(self, P):
+        """
+        Calculate the Phi and Phi inverse map without the cache.
 
-        for i in range(len(r)):
+        Parameters
+        ----------
+        P : list of list of int
+            The P box
+
+        Returns
+        -------
+        tuple of list of int
+            Phi and Phi inverse
+        """
+        size = 2**self.N
+        rows = self.matrix_to_rows(P)
+
+        # Ring (r) and XOR (x) sum of the rows of P selected by every a,
+        # each built from a without its lowest bit
+        r = [0 for _ in range(size)]
+        x = [0 for _ in range(size)]
+        for a in range(1, size):
+            rest = a & (a-1)
+            row = rows[(a & -a).bit_length()-1]
+            r[a] = self.ring(r[rest], row)
+            x[a] = x[rest] ^ row
+
+        # First j > i with x[j] == r[i], found walking i downwards
+        next_x = [None for _ in range(size)]
+        first = {}
+        for i in range(size-1, -1, -1):
+            next_x[i] = first.get(r[i])
+            first[x[i]] = i
+
+        phi = [i for i in range(size)]
+        phi_inv = [i for i in range(size)]
+        for i in range(size):
             if r[i] != x[i]:
                 phi[x[i]] = r[i]
                 phi[r[i]] = x[i]
 
-                for j in range(i+1, len(r)):
-                    if x[j] == r[i]:
-                        t = phi_inv[i]
-                        phi_inv[i] = phi_inv[j]
-                        phi_inv[j] = t
-                        break
-        phi = [v for _, v in phi.items()]
+                j = next_x[i]
+                if j != None:
+                    phi_inv[i], phi_inv[j] = phi_inv[j], phi_inv[i]
         return phi, phi_inv
 
+    def __kernel_rows(self, R):
+        """
+        Get a basis of the combinations of rows adding to zero.
+
+        Parameters
+        ----------
+        R : list of int
+
+        Returns
+        -------
+        list of int
+            every combination as an integer, bit i selecting row i
+        """
+        # leading bit -> [basis vector, combination of the rows in R]
+        basis = {}
+        kernel = []
+        for i, r in enumerate(R):
+            comb = 1 << i
+            while r and r.bit_length() in basis:
+                b, c = basis[r.bit_length()]
+                r ^= b
+                comb ^= c
+            if r:
+                basis[r.bit_length()] = [r, comb]
+            else:
+                kernel.append(comb)
+        return kernel
+
+    def __random_span(self, V):
+        """
+        Get a uniformly random vector of the span of V.
+
+        Parameters
+        ----------
+        V : list of int
+            linearly independent vectors
+
+        Returns
+        -------
+        int
+        """
+        return self.rows_mul_vector(random.getrandbits(len(V)) if V else 0, V)
+
+    def __parity(self, x):
+        """
+        Get the parity of the set bits of x.
+
+        Parameters
+        ----------
+        x : int
+
+        Returns
+        -------
+        int
+            0 or 1
+        """
+        return bin(x).count('1') & 1
+
+    def __form_masks(self, F, x):
+        """
+        Get the bits of x.y as functionals of y.
+
+        Parameters
+        ----------
+        F : list of list of int
+            the form, F[a][c] selecting the b with bit c of e_a.e_b set
+        x : int
+            a vector in coordinates of C
+
+        Returns
+        -------
+        list of int
+            mask c selecting the y with bit c of x.y set, by parity
+        """
+        M = [0 for _ in F[0]]
+        a = 0
+        while x:
+            if x & 1:
+                M = [u ^ v for u, v in zip(M, F[a])]
+            x >>= 1
+            a += 1
+        return M
+
+    def __dot_structure(self):
+        """
+        Get the dot product on a complement of its radical.
+
+        The dot product only depends on the first n = N-k bits, where it
+        is an alternating map U x U -> W to the last k bits. It is written
+        on a complement C of its radical, in coordinates of a basis of its
+        image. When the image has more than one non-zero value the
+        similitudes of the dot product are found as well. The structure is
+        computed once per (N, k) and shared in the process.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        tuple
+            C, the radical and the image basis (list of int), D the
+            products of C in image coordinates and F as used by
+            __form_masks (list of list of int), a basis of the adjoint
+            algebra holding every isometry (list of int) and every
+            multiplier Q with one similitude Z having it (list of tuple),
+            the last two None when the image has a single non-zero value
+        """
+        key = (self.N, self.k)
+        if key in _dot_structures:
+            return _dot_structures[key]
+
+        k = min(self.k, self.N)
+        n = self.N-k
+        # Row i is the dot product of e_i with every e_j, k bits each
+        D = [[self.dot(1 << i, 1 << j) >> n for j in range(n)] for i in range(n)]
+        radical = self.__kernel_rows([sum(d << k*j for j, d in enumerate(D_i)) for D_i in D])
+
+        # Unit vectors completing the radical to a basis
+        C = []
+        basis = {}
+        for i, v in enumerate(radical + [1 << j for j in range(n)]):
+            r = v
+            while r and r.bit_length() in basis:
+                r ^= basis[r.bit_length()]
+            if r:
+                basis[r.bit_length()] = r
+                if i >= len(radical):
+                    C.append(v)
+
+        D = [[self.dot(a, b) >> n for b in C] for a in C]
+        # leading bit -> [basis vector, combination of the image basis]
+        image = []
+        basis = {}
+        for D_a in D:
+            for w in D_a:
+                r = w
+                comb = 0
+                while r and r.bit_length() in basis:
+                    b, c = basis[r.bit_length()]
+                    r ^= b
+                    comb ^= c
+                if r:
+                    basis[r.bit_length()] = [r, comb ^ 1 << len(image)]
+                    image.append(w)
+        for D_a in D:
+            for j, w in enumerate(D_a):
+                comb = 0
+                while w:
+                    b, c = basis[w.bit_length()]
+                    w ^= b
+                    comb ^= c
+                D_a[j] = comb
+
+        e = len(image)
+        F = [[sum((D_a[b] >> c & 1) << b for b in range(len(C))) for c in range(e)]
+             for D_a in D]
+
+        isometries = None
+        similitudes = None
+        if e > 1:
+            isometries = self.__adjoint_rows(D, [1 << c for c in range(e)])
+            similitudes = []
+            for Q in self.__similitude_multipliers(F):
+                QD = [[self.rows_mul_vector(w, Q) for w in D_i] for D_i in D]
+                Z = self.__complete_similitude(F, QD, 0, self.__adjoint_rows(D, Q), [])
+                if Z != None:
+                    similitudes.append((Q, Z))
+
+        _dot_structures[key] = (C, radical, image, D, F, isometries, similitudes)
+        return _dot_structures[key]
+
+    def __adjoint_rows(self, D, Q):
+        """
+        Get a basis of the adjoint maps of the dot product with multiplier Q.
+
+        These are the maps X of C with a map Y such that (xX).y equals
+        Q(x.(yY)) for every x and y. A similitude with multiplier Q is one,
+        with Y its inverse, so searching only the span of this basis keeps
+        every similitude while dropping most of the maps of C.
+
+        Parameters
+        ----------
+        D : list of list of int
+            the products of C in image coordinates
+        Q : list of int
+            the multiplier as rows on the image coordinates
+
+        Returns
+        -------
+        list of int
+            the maps, row i of a map in bits i*m to i*m+m-1 where m is the
+            dimension of C
+        """
+        m = len(D)
+        e = len(Q)
+        # The unknowns are X[a][p] at a*m+p and Y[b][q] at m*m+b*m+q, the
+        # e bits of the equation of x = e_a and y = e_b at (a*m+b)*e
+        columns = [0 for _ in range(2*m*m)]
+        for a in range(m):
+            for b in range(m):
+                shift = (a*m+b)*e
+                for p in range(m):
+                    if D[p][b]:
+                        columns[a*m+p] ^= D[p][b] << shift
+                for q in range(m):
+                    if D[a][q]:
+                        columns[m*m+b*m+q] ^= self.rows_mul_vector(D[a][q], Q) << shift
+        mask = 2**(m*m)-1
+        return [c & mask for c in self.__kernel_rows(columns)]
+
+    def __similitude_multipliers(self, F):
+        """
+        Get the maps of the image that may multiply a similitude.
+
+        A similitude with multiplier Q maps the radical of l(x.y) onto the
+        radical of l(Q(x.y)) for every functional l of the image, so both
+        have the same rank. The functionals are given images one at a time
+        and every candidate breaking a rank is dropped.
+
+        Parameters
+        ----------
+        F : list of list of int
+            the form as used by __form_masks
+
+        Returns
+        -------
+        list of list of int
+            every candidate multiplier as rows on the image coordinates
+        """
+        e = len(F[0])
+        rank = [0]
+        for l in range(1, 2**e):
+            R = [self.rows_mul_vector(l, F_a) for F_a in F]
+            rank.append(len(R) - len(self.__kernel_rows(R)))
+
+        candidates = []
+        stack = [[]]
+        while stack:
+            P = stack.pop()
+            if len(P) == e:
+                # l(Q(w)) is (lP)(w), so Q is the transpose of P
+                candidates.append([sum((P[c] >> j & 1) << c for c in range(e)) for j in range(e)])
+                continue
+            c = len(P)
+            for image in range(1, 2**e):
+                if all(rank[self.rows_mul_vector(l, P + [image])] == rank[l]
+                       for l in range(2**c, 2**(c+1))):
+                    stack.append(P + [image])
+        return candidates
+
+    def __restrict(self, X_0, V, mask, bit):
+        """
+        Restrict an affine space of maps to one linear equation.
+
+        Parameters
+        ----------
+        X_0 : int
+            a map of the space
+        V : list of int
+            a basis of the directions of the space
+        mask : int
+        bit : int
+            the equation, the parity of the bits of X & mask being bit
+
+        Returns
+        -------
+        tuple or None
+            the restricted X_0 and V, None if no map solves the equation
+        """
+        if mask & (mask-1) == 0:
+            hits = [i for i, v in enumerate(V) if v & mask]
+        else:
+            hits = [i for i, v in enumerate(V) if self.__parity(v & mask)]
+        if hits == []:
+            if self.__parity(X_0 & mask) != bit:
+                return None
+            return X_0, V
+        p = V[hits[0]]
+        if self.__parity(X_0 & mask) != bit:
+            X_0 ^= p
+        hit = set(hits)
+        return X_0, [v ^ p if i in hit else v for i, v in enumerate(V) if i != hits[0]]
+
+    def __row_space(self, F, QD, X_0, V, S):
+        """
+        Get the candidates of the next row of a similitude.
+
+        The maps of the space are restricted to those keeping the products
+        of the next row with the rows S before it.
+
+        Parameters
+        ----------
+        F : list of list of int
+            the form as used by __form_masks
+        QD : list of list of int
+            the products of C after the multiplier
+        X_0 : int
+            a map of the space, whose first rows are S
+        V : list of int
+            a basis of the directions of the space
+        S : list of int
+            the rows before
+
+        Returns
+        -------
+        tuple or None
+            the restricted X_0 and V, the next row of X_0 and a basis of
+            the next rows of V, None if no map is left
+        """
+        m = len(F)
+        i = len(S)
+        for j, s in enumerate(S):
+            for c, f in enumerate(self.__form_masks(F, s)):
+                space = self.__restrict(X_0, V, f << i*m, QD[i][j] >> c & 1)
+                if space == None:
+                    return None
+                X_0, V = space
+
+        rows = [v >> i*m & (2**m-1) for v in V]
+        # leading bit -> vector, keeping the rows independent
+        span = {}
+        for r in rows:
+            while r and r.bit_length() in span:
+                r ^= span[r.bit_length()]
+            if r:
+                span[r.bit_length()] = r
+        return X_0, V, X_0 >> i*m & (2**m-1), list(span.values())
+
+    def __fix_row(self, F, X_0, V, S, x):
+        """
+        Fix the next row of a similitude to x.
+
+        x is rejected when it is dependent on the rows S before it, or
+        when x.y does not have the rank of e_i.y as a map of y.
+
+        Parameters
+        ----------
+        F : list of list of int
+            the form as used by __form_masks
+        X_0 : int
+            a map of the space, whose first rows are S
+        V : list of int
+            a basis of the directions of the space
+        S : list of int
+            the rows before
+        x : int
+
+        Returns
+        -------
+        tuple or None
+            the restricted X_0 and V, None if x is rejected
+        """
+        m = len(F)
+        i = len(S)
+        M = self.__form_masks(F, x)
+        if len(M) - len(self.__kernel_rows(M)) != len(F[i]) - len(self.__kernel_rows(F[i])):
+            return None
+        if self.__kernel_rows(S + [x]) != []:
+            return None
+        for p in range(m):
+            X_0, V = self.__restrict(X_0, V, 1 << i*m+p, x >> p & 1)
+        return X_0, V
+
+    def __complete_similitude(self, F, QD, X_0, V, S):
+        """
+        Complete the first rows of a similitude.
+
+        The candidates of every row are tried in order, backtracking when
+        no map is left.
+
+        Parameters
+        ----------
+        F : list of list of int
+            the form as used by __form_masks
+        QD : list of list of int
+            the products of C after the multiplier
+        X_0 : int
+            a map of the space, whose first rows are S
+        V : list of int
+            a basis of the directions of the space
+        S : list of int
+            the rows before
+
+        Returns
+        -------
+        list of int or None
+            the rows of a similitude, None if S does not extend to one
+        """
+        if len(S) == len(F):
+            return S
+        space = self.__row_space(F, QD, X_0, V, S)
+        if space == None:
+            return None
+        X_0, V, x_0, R = space
+        for sel in range(2**len(R)):
+            x = x_0 ^ self.rows_mul_vector(sel, R)
+            fixed = self.__fix_row(F, X_0, V, S, x)
+            if fixed != None:
+                Z = self.__complete_similitude(F, QD, fixed[0], fixed[1], S + [x])
+                if Z != None:
+                    return Z
+        return None
+
+    def __random_isometry(self, F, D, isometries):
+        """
+        Get a uniformly random isometry of the dot product on C.
+
+        Every row is drawn uniformly from its candidates until one extends
+        to a whole isometry. The first rows of an isometry extend to as
+        many isometries whatever they are, so the isometry is uniform.
+        The candidates span the adjoint maps fitting the rows before, so
+        the search rarely backtracks.
+
+        Parameters
+        ----------
+        F : list of list of int
+            the form as used by __form_masks
+        D : list of list of int
+            the products of C in image coordinates
+        isometries : list of int
+            a basis of the adjoint algebra, containing every isometry
+
+        Returns
+        -------
+        list of int
+            the isometry rows in coordinates of C
+        """
+        m = len(F)
+        X_0 = 0
+        V = isometries
+        S = []
+        while len(S) < m:
+            X_0, V, x_0, R = self.__row_space(F, D, X_0, V, S)
+            while True:
+                x = x_0 ^ self.__random_span(R)
+                fixed = self.__fix_row(F, X_0, V, S, x)
+                # A single candidate is the one extending the rows before
+                if fixed != None and (R == [] or self.__complete_similitude(
+                        F, D, fixed[0], fixed[1], S + [x]) != None):
+                    break
+            X_0, V = fixed
+            S.append(x)
+            if V == []:
+                # Every isometry extending S is in the space, so it is X_0
+                return [X_0 >> i*m & (2**m-1) for i in range(m)]
+        return S
+
+    def __random_symplectic_basis(self, F):
+        """
+        Get a uniformly random symplectic basis of C.
+
+        With a single non-zero value the dot product is a symplectic form
+        on C. The basis is drawn a pair (a, b) with a.b non-zero at a time
+        from the vectors orthogonal to the pairs before.
+
+        Parameters
+        ----------
+        F : list of list of int
+            the form as used by __form_masks
+
+        Returns
+        -------
+        list of int
+            the basis in coordinates of C
+        """
+        B = []
+        K = [1 << i for i in range(len(F))]
+        while K:
+            a = self.rows_mul_vector(random.randint(1, 2**len(K)-1), K)
+            f_a = self.__form_masks(F, a)[0]
+            f = [self.__parity(f_a & v) for v in K]
+            l = f.index(1)
+            b = K[l] ^ self.__random_span([K[j] ^ (K[l] if f[j] else 0)
+                                           for j in range(len(K)) if j != l])
+            B += [a, b]
+            f_b = self.__form_masks(F, b)[0]
+            # The vectors of K orthogonal to both a and b
+            R = [self.__parity(f_a & v) | self.__parity(f_b & v) << 1 for v in K]
+            K = [self.rows_mul_vector(c, K) for c in self.__kernel_rows(R)]
+        return B
+
+    def random_linear_rows(self):
+        """
+        Get a uniformly random matrix linear in XOR and Ring and its inverse.
+
+        As a o b = a + b + a.b, a matrix A is linear in Ring when
+        (a.b)A = aA.bA. The dot product only depends on the first n = N-k
+        bits U, where it is an alternating map to the last k bits W. With
+        U = C + R, R the radical of the dot product, A is linear in Ring
+        exactly when it maps C by a similitude S of the dot product on C
+        plus any vector of R + W, and maps R + W onto itself keeping the
+        image of the dot product, acting on it as the multiplier Q of S.
+
+        Every part is drawn uniformly and independently, so A is uniform
+        over the whole group linear in XOR and Ring. With a single
+        non-zero value, which always holds for k = 1, S is drawn through
+        two random symplectic bases. Otherwise Q is drawn from the
+        multipliers found by __dot_structure and S is a uniform isometry
+        times the similitude kept for Q. With n at most 1 the dot product
+        is zero, Ring is XOR and any invertible matrix is drawn.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        tuple of list of int
+            the matrix and its inverse as integer rows
+        """
+        k = min(self.k, self.N)
+        n = self.N-k
+        if n <= 1:
+            return self.random_invertible_rows(self.N)
+
+        C, radical, image, D, F, isometries, similitudes = self.__dot_structure()
+        if len(image) == 1:
+            Q = [1]
+            S = self.rows_mul(self.calculate_inverse_rows(self.__random_symplectic_basis(F)),
+                              self.__random_symplectic_basis(F))
+        else:
+            Q, Z = random.choice(similitudes)
+            S = self.rows_mul(self.__random_isometry(F, D, isometries), Z)
+
+        # R + W, spanned by the radical and the unit vectors of W
+        X = radical + [1 << i for i in range(n, self.N)]
+        basis = [w << n for w in image]
+        images = [self.rows_mul_vector(q, image) << n for q in Q]
+        # leading bit -> vector, for the basis and for its images
+        span = {}
+        span_images = {}
+        for v, v_image in zip(basis, images):
+            for s, r in [(span, v), (span_images, v_image)]:
+                while r and r.bit_length() in s:
+                    r ^= s[r.bit_length()]
+                s[r.bit_length()] = r
+        for v in X:
+            r = v
+            while r and r.bit_length() in span:
+                r ^= span[r.bit_length()]
+            if not r:
+                continue
+            span[r.bit_length()] = r
+            while True:
+                y = self.__random_span(X)
+                r = y
+                while r and r.bit_length() in span_images:
+                    r ^= span_images[r.bit_length()]
+                if r:
+                    break
+            span_images[r.bit_length()] = r
+            basis.append(v)
+            images.append(y)
+
+        basis = C + basis
+        images = [self.rows_mul_vector(s, C) ^ self.__random_span(X) for s in S] + images
+        R = self.rows_mul(self.calculate_inverse_rows(basis), images)
+        return R, self.calculate_inverse_rows(R)
+
     def get_Bx(self, b):
         """
         Get the B_x variable.
@@ -240,6 +967,48 @@ class Operations(Matrix):
 
         return I
 
+    def ring_table(self):
+        """
+        Get the table of every ring product.
+
+        The table is computed once per (N, k) and shared in the process,
+        and through the on-disk cache between processes. A table already
+        in the process is still written to a cache missing it.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        array of int
+            a o b at position a*2**N + b
+        """
+        key = (self.N, self.k)
+        tc = self.lanes_typecode(self.N)
+        name = 'ring_N{}_k{}'.format(self.N, self.k)
+        if key in _ring_tables:
+            T = _ring_tables[key]
+            if self.cache != None and not self.cache.exists(name, tc):
+                self.cache.store(name, T, tc)
+            return T
+
+        T = None
+        if self.cache != None:
+            T = self.cache.load(name, tc)
+
+        if T == None:
+            size = 2**self.N
+            T = array(tc, bytes(array(tc).itemsize*size*size))
+            for b in range(size):
+                Mx = self.matrix_to_rows(self.get_Bx(b))
+                T[b::size] = array(tc, [a ^ b for a in self.rows_mul_vectors(range(size), Mx)])
+            if self.cache != None:
+                self.cache.store(name, T, tc)
+
+        _ring_tables[key] = T
+        return T
+
     def ring(self, a, b):
         """
         Preform the Ring (o) operation.
@@ -254,12 +1023,9 @@ class Operations(Matrix):
         int
             a o b
         """
-        a_m = self.int_to_binary(a, self.N)
-        b_m = self.int_to_binary(b, self.N)
-        Mx = self.get_Bx(b)
-        aM_b = self.matrix_mul_row_column(a_m, Mx)
-        aM_bb = self.matrix_sum(aM_b, b_m)
-        return self.binary_to_int(aM_bb)
+        if self.table != None and not (a | b) >> self.N:
+            return self.table[(a << self.N) | b]
+        return a ^ b ^ self.__ring_offset(a, b)
 
     def dot(self, a, b):
         """
@@ -275,10 +1041,135 @@ class Operations(Matrix):
         int
             a.b
         """
-        a_plus_b = self.matrix_sum(self.int_to_binary(a, self.N), self.int_to_binary(b, self.N))
-        a_ring_b = self.int_to_binary(self.ring(a, b), self.N)
-        a_dot_b = self.matrix_sum(a_plus_b, a_ring_b)
-        return self.binary_to_int(a_dot_b)
+        return a ^ b ^ self.ring(a, b)
+
+    def __ring_offset_many(self, A, B):
+        """
+        Calculate a o b + a + b elementwise over lists.
+
+        A and B are packed into lanes so the offset is computed for all
+        elements with a few operations per Bex entry. An int in A or B is
+        used for every element.
+
+        Parameters
+        ----------
+        A : int or list of int
+        B : int or list of int
+
+        Returns
+        -------
+        tuple
+            the offsets packed in lanes, A and B packed in lanes, the
+            number of lanes and the lane typecode (None if not packed)
+        """
+        if type(A) == int and type(B) == int:
+            A = [A]
+        if type(A) == int:
+            A = [A for _ in B]
+        if type(B) == int:
+            B = [B for _ in A]
+        if len(A) != len(B):
+            raise ValueError("A and B are not of equal length.")
+
+        K = len(A)
+        tc = self.lanes_typecode(self.N)
+        if tc == None:
+            return [self.__ring_offset(a, b) for a, b in zip(A, B)], A, B, K, None
+
+        a_l = self.pack_lanes(A, tc)
+        b_l = self.pack_lanes(B, tc)
+        ones = self.pack_lanes([1 for _ in range(K)], tc)
+
+        n = len(self.Bex_masks)
+        mask = 2**self.k-1
+        b_i = [(b_l >> i) & ones for i in range(n)]
+        offset = 0
+        for r in range(n):
+            # Sum of row r of every B_ex selected by b, in the last k bits
+            Bx_r = 0
+            for i in range(n):
+                c = (self.Bex_masks[i] >> (self.k*r)) & mask
+                if c:
+                    Bx_r ^= b_i[i]*(c << (self.N-self.k))
+            if Bx_r:
+                offset ^= (((a_l >> r) & ones)*(2**self.N-1)) & Bx_r
+        return offset, a_l, b_l, K, tc
+
+    def ring_many(self, A, B):
+        """
+        Preform the Ring (o) operation elementwise over lists.
+
+        Parameters
+        ----------
+        A : int or list of int
+        B : int or list of int
+            lists of equal length, an int is used for every element
+
+        Returns
+        -------
+        list of int
+            a o b for every element
+        """
+        offset, a_l, b_l, K, tc = self.__ring_offset_many(A, B)
+        if tc == None:
+            return [a ^ b ^ o for a, b, o in zip(a_l, b_l, offset)]
+        return self.unpack_lanes(a_l ^ b_l ^ offset, K, tc)
+
+    def dot_many(self, A, B):
+        """
+        Preform the Dot (.) product elementwise over lists.
+
+        Parameters
+        ----------
+        A : int or list of int
+        B : int or list of int
+            lists of equal length, an int is used for every element
+
+        Returns
+        -------
+        list of int
+            a.b for every element
+        """
+        offset, _, _, K, tc = self.__ring_offset_many(A, B)
+        if tc == None:
+            return offset
+        return self.unpack_lanes(offset, K, tc)
+
+    def ring_outer(self, A, B):
+        """
+        Preform the Ring (o) operation on every pair of A and B.
+
+        Parameters
+        ----------
+        A : list of int
+        B : list of int
+
+        Returns
+        -------
+        list of list of int
+            a o b for a in A (rows) and b in B (columns)
+        """
+        B = list(B)
+        res = self.ring_many([a for a in A for _ in B], B*len(A))
+        return [res[i:i+len(B)] for i in range(0, len(res), len(B))]
+
+    def dot_outer(self, A, B):
+        """
+        Preform the Dot (.) product on every pair of A and B.
+
+        Parameters
+        ----------
+        A : list of int
+        B : list of int
+
+        Returns
+        -------
+        list of list of int
+            a.b for a in A (rows) and b in B (columns)
+        """
+        B = list(B)
+        res = self.dot_many([a for a in A for _ in B], B*len(A))
+        return [res[i:i+len(B)] for i in range(0, len(res), len(B))]
 
     def matrix_mul_row_ring(self, M, x, y):
         """
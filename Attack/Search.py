@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+"""Search for attackable ciphers."""
+
+from .HiddenSum import HiddenSum
+from ToyCipher.ToyCipher import ToyCipher
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import logging
+import os
+import random
+import time
+
+
+class Search:
+    """
+    Search for attackable ciphers over a pool of processes.
+
+    Every process builds batches of random ToyCipher classes and keeps
+    those HiddenSum accepts. The search stops after a number of hits.
+
+    ...
+
+    Attributes
+    ----------
+    N : int
+        the length of the block
+    k : int
+        size of the modifying matrix
+    rounds : int
+        how many rounds the ciphers have
+    num_of_gamma : int
+        number of S boxes the block is split into
+    processes : int
+        number of processes, 1 to search in this process
+    batch : int
+        number of candidates a process checks per task
+    candidates : int
+        number of candidates checked so far
+    hits : list of ToyCipher
+        the attackable ciphers found so far
+    rejections : dict
+        number of rejected candidates per reason
+
+    Methods
+    -------
+    __task():
+        get the arguments of the next task
+    __collect(result, hits, file_name, hard):
+        add the result of a task
+    __done(hits, max_candidates):
+        check if the search is done
+    run(hits, file_name, max_candidates, report_every, hard):
+        search for attackable ciphers
+    elapsed():
+        get the time since the search started
+    rate():
+        get the number of candidates checked per second
+    eta(hits, max_candidates):
+        get the estimated time until the search is done
+    report(hits, max_candidates):
+        get a line describing the progress of the search
+    """
+
+    def __init__(self, N=3, k=1, rounds=1, num_of_gamma=1, processes=None, batch=32):
+        """
+        Init default parameters.
+
+        Parameters
+        ----------
+        N : int
+            the length of the block
+        k : int
+            size of the modifying matrix
+        rounds : int
+            how many rounds the ciphers have
+        num_of_gamma : int
+            number of S boxes the block is split into
+        processes : int or None
+            number of processes, 1 to search in this process and None
+            for one per CPU
+        batch : int
+            number of candidates a process checks per task
+        """
+        self.N = N
+        self.k = k
+        self.rounds = rounds
+        self.num_of_gamma = num_of_gamma
+        self.processes = processes or os.cpu_count() or 1
+        self.batch = batch
+        self.candidates = 0
+        self.hits = []
+        self.rejections = {}
+        self.__start = time.perf_counter()
+
+    def __task(self):
+        """
+        Get the arguments of the next task.
+
+        Every task gets its own seed, forked processes would otherwise
+        draw the same candidates.
+
+        Returns
+        -------
+        tuple
+        """
+        return (self.N, self.k, self.rounds, self.num_of_gamma, self.batch,
+                random.getrandbits(64))
+
+    def __collect(self, result, hits, file_name, hard):
+        """
+        Add the result of a task.
+
+        Parameters
+        ----------
+        result : tuple
+            the attackable ciphers and rejections of the task
+        hits : int
+            number of ciphers to find
+        file_name : str or None
+            where hit i is saved, formatted with i
+        hard : bool
+            overwrite existing files
+
+        Returns
+        -------
+        None
+        """
+        found, rejections = result
+        self.candidates += len(found) + sum(rejections.values())
+        for reason, count in rejections.items():
+            self.rejections[reason] = self.rejections.get(reason, 0) + count
+
+        for t in found:
+            if len(self.hits) >= hits:
+                break
+            if file_name != None:
+                t.save_cipher(file_name.format(len(self.hits)), hard=hard)
+            self.hits.append(t)
+
+    def __done(self, hits, max_candidates):
+        """
+        Check if the search is done.
+
+        Parameters
+        ----------
+        hits : int
+            number of ciphers to find
+        max_candidates : int or None
+            largest number of candidates to check
+
+        Returns
+        -------
+        bool
+        """
+        if len(self.hits) >= hits:
+            return True
+        return max_candidates != None and self.candidates >= max_candidates
+
+    def run(self, hits=1, file_name=None, max_candidates=None, report_every=10, hard=False):
+        """
+        Search for attackable ciphers.
+
+        Parameters
+        ----------
+        hits : int
+            number of ciphers to find
+        file_name : str or None
+            where hit i is saved with save_cipher, formatted with i
+        max_candidates : int or None
+            stop after this many candidates, None to never stop before
+            all hits are found
+        report_every : float or None
+            seconds between progress lines logged at level INFO
+        hard : bool
+            overwrite existing files
+
+        Returns
+        -------
+        list of ToyCipher
+            the attackable ciphers found
+        """
+        log = logging.getLogger(__name__)
+        self.candidates = 0
+        self.hits = []
+        self.rejections = {}
+        self.__start = time.perf_counter()
+        last_report = self.__start
+
+        if self.processes == 1:
+            while not self.__done(hits, max_candidates):
+                self.__collect(_search_worker(self.__task()), hits, file_name, hard)
+                if report_every != None and time.perf_counter() - last_report >= report_every:
+                    log.info(self.report(hits, max_candidates))
+                    last_report = time.perf_counter()
+            return self.hits
+
+        with ProcessPoolExecutor(self.processes) as pool:
+            pending = {pool.submit(_search_worker, self.__task()) for _ in range(2*self.processes)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    self.__collect(f.result(), hits, file_name, hard)
+                if self.__done(hits, max_candidates):
+                    for f in pending:
+                        f.cancel()
+                    break
+                while len(pending) < 2*self.processes:
+                    pending.add(pool.submit(_search_worker, self.__task()))
+                if report_every != None and time.perf_counter() - last_report >= report_every:
+                    log.info(self.report(hits, max_candidates))
+                    last_report = time.perf_counter()
+        return self.hits
+
+    def elapsed(self):
+        """
+        Get the time since the search started.
+
+        Returns
+        -------
+        float
+            seconds
+        """
+        return time.perf_counter() - self.__start
+
+    def rate(self):
+        """
+        Get the number of candidates checked per second.
+
+        Returns
+        -------
+        float
+        """
+        elapsed = self.elapsed()
+        return self.candidates / elapsed if elapsed > 0 else 0.0
+
+    def eta(self, hits=1, max_candidates=None):
+        """
+        Get the estimated time until the search is done.
+
+        The hits are assumed to keep coming at the rate seen so far.
+
+        Parameters
+        ----------
+        hits : int
+            number of ciphers to find
+        max_candidates : int or None
+            largest number of candidates to check
+
+        Returns
+        -------
+        float or None
+            seconds, None if there is nothing to estimate from yet
+        """
+        rate = self.rate()
+        if rate == 0:
+            return None
+
+        eta = None
+        if len(self.hits) > 0:
+            per_hit = self.candidates / len(self.hits)
+            eta = max(0, hits - len(self.hits)) * per_hit / rate
+        if max_candidates != None:
+            left = max(0, max_candidates - self.candidates) / rate
+            eta = left if eta == None else min(eta, left)
+        return eta
+
+    def report(self, hits=1, max_candidates=None):
+        """
+        Get a line describing the progress of the search.
+
+        Parameters
+        ----------
+        hits : int
+            number of ciphers to find
+        max_candidates : int or None
+            largest number of candidates to check
+
+        Returns
+        -------
+        str
+        """
+        eta = self.eta(hits, max_candidates)
+        return "candidates: {}, {:.1f} candidates/s, hits: {}/{}, ETA: {}, rejections: {}".format(
+            self.candidates, self.rate(), len(self.hits), hits,
+            "unknown" if eta == None else "{:.0f}s".format(eta), self.rejections
+        )
+
+
+def _search_worker(args):
+    """
+    Check a batch of random ciphers.
+
+    Rejections are grouped by the part of the error before the first
+    comma, so details such as the failing S boxes are left out.
+
+    Parameters
+    ----------
+    args : tuple
+        N, k, rounds, num_of_gamma, the batch size and a seed
+
+    Returns
+    -------
+    tuple
+        the attackable ciphers and the number of rejections per reason
+    """
+    N, k, rounds, num_of_gamma, batch, seed = args
+    random.seed(seed)
+    found = []
+    rejections = {}
+    for _ in range(batch):
+        t = ToyCipher(block_len=N, rounds=rounds, num_of_gamma=num_of_gamma)
+        try:
+            HiddenSum(N=N, k=k, t=t)
+        except ValueError as e:
+            reason = str(e).split(',')[0]
+            rejections[reason] = rejections.get(reason, 0) + 1
+            continue
+        found.append(t)
+    return found, rejections
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+"""Persistent cache of precomputed tables."""
+
+from array import array
+from pathlib import Path
+import mmap
+import os
+import tempfile
+
+
+class TableCache:
+    """
+    A directory of precomputed tables shared between processes.
+
+    Every table is one file holding the raw bytes of an array, loaded
+    read-only through mmap so processes share the pages. When the
+    directory grows past max_bytes the least recently used tables are
+    removed.
+
+    ...
+
+    Attributes
+    ----------
+    directory : Path
+        where the tables are stored
+    max_bytes : int
+        largest total size of the tables
+
+    Methods
+    -------
+    __path(name, tc):
+        get the path of a table
+    exists(name, tc):
+        check if a table is cached
+    load(name, tc):
+        load a table
+    store(name, values, tc):
+        store a table
+    evict(keep):
+        remove tables until the cache fits in max_bytes
+    """
+
+    def __init__(self, directory=None, max_bytes=2**30):
+        """
+        Init default parameters.
+
+        Parameters
+        ----------
+        directory : str or Path
+            where the tables are stored, defaults to $CIRCMOD_CACHE_DIR
+            or ~/.cache/circmod
+        max_bytes : int
+            largest total size of the tables
+        """
+        if directory == None:
+            directory = os.environ.get('CIRCMOD_CACHE_DIR',
+                                       Path.home().joinpath('.cache', 'circmod'))
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def __path(self, name, tc):
+        """
+        Get the path of a table.
+
+        Parameters
+        ----------
+        name : str
+            name of the table
+        tc : str
+            array typecode of the table
+
+        Returns
+        -------
+        Path
+        """
+        return self.directory.joinpath('{}.{}{}'.format(name, tc, array(tc).itemsize))
+
+    def exists(self, name, tc):
+        """
+        Check if a table is cached.
+
+        Unlike load, the table is not opened nor marked as recently used.
+
+        Parameters
+        ----------
+        name : str
+            name of the table
+        tc : str
+            array typecode of the table
+
+        Returns
+        -------
+        bool
+        """
+        return self.__path(name, tc).is_file()
+
+    def load(self, name, tc):
+        """
+        Load a table.
+
+        Loading marks the table as recently used, unless the directory
+        is read-only.
+
+        Parameters
+        ----------
+        name : str
+            name of the table
+        tc : str
+            array typecode of the table
+
+        Returns
+        -------
+        memoryview of int or None
+            the table, None if it is not cached
+        """
+        path = self.__path(name, tc)
+        try:
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # A read-only cache is still read, it is just never evicted
+            pass
+        return memoryview(mm).cast(tc)
+
+    def store(self, name, values, tc):
+        """
+        Store a table.
+
+        The table is written to a temporary file and moved in place, so
+        other processes never load a partial table.
+
+        Parameters
+        ----------
+        name : str
+            name of the table
+        values : list of int or array
+            the table
+        tc : str
+            array typecode of the table
+
+        Returns
+        -------
+        None
+        """
+        path = self.__path(name, tc)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            array(tc, values).tofile(f)
+        os.replace(tmp, path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """
+        Remove tables until the cache fits in max_bytes.
+
+        Parameters
+        ----------
+        keep : Path
+            a table that is never removed
+
+        Returns
+        -------
+        None
+        """
+        tables = []
+        total = 0
+        for path in self.directory.iterdir():
+            if path.name.startswith('.tmp'):
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            tables.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        for _, size, path in sorted(tables):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -2,7 +2,8 @@
 
 """PBox used in the ToyCipher class."""
 
-import copy
+from Attack.Operations import Operations
+
 import random
 
 
@@ -14,7 +15,8 @@ class PBox:
 
     Attributes
     ----------
-    None
+    p_box_width : int or None
+        bits per P-box lookup table, None to multiplicate row by row
 
     Methods
     -------
@@ -22,10 +24,18 @@ class PBox:
         Verify that P is a valid gamma in terms of content and size.
     permutation_box(num_of_octals):
         Create the encryption (P) and decryption (P_I) permutation matrix
+    compile_p_box(width):
+        Set the width of the P-box lookup tables
+    __p_box_tables(encrypt):
+        Get P or P_I as integer rows and lookup tables
     p_box_multiplication(data, encrypt):
         Preform row multiplication
+    p_box_multiplication_many(data, encrypt):
+        Preform row multiplication on many blocks
     find_attackable_lambda(N, k):
         faster way to find attackable lambda
+    find_attackable_lambdas(N, k, count):
+        find many attackable lambda
     """
 
     def __init__(self):
@@ -39,6 +49,7 @@ class PBox:
         P_I : list of int
             inverse matrix of P
         """
+        self.compile_p_box()
         self.P, self.P_I = self.permutation_box()
         super().__init__()
 
@@ -75,6 +86,9 @@ class PBox:
         """
         Create the permutation and inverse permutation boxes.
 
+        Without P a uniformly random invertible matrix is drawn, from
+        the whole group linear in both XOR and Ring when k is set.
+
         Parameters
         ----------
         P : list of int
@@ -101,18 +115,59 @@ class PBox:
                 self.P_I = P_I
             return P, P_I
 
-        P_I = []
-        while P_I == []:
-            P_tmp = []
-            for _ in range(self.block_len):
-                tmp = []
-                for _ in range(self.block_len):
-                    rand = random.randint(0, 1)
-                    tmp.append(rand)
-                P_tmp.append(tmp)
-            P = copy.deepcopy(P_tmp)
-            P_I = self.calculate_inverse(P_tmp)
-        return P, P_I
+        if self.k != None:
+            P, P_I = Operations(N=self.block_len, k=self.k).random_linear_rows()
+        else:
+            P, P_I = self.random_invertible_rows(self.block_len)
+        return self.rows_to_matrix(P), self.rows_to_matrix(P_I)
+
+    def compile_p_box(self, width=8):
+        """
+        Set the width of the P-box lookup tables.
+
+        P and P_I are split into tables indexed by width bits of a block,
+        so permutating a block costs one lookup per width bits.
+
+        Parameters
+        ----------
+        width : int or None
+            bits per table, None to multiplicate row by row
+
+        Returns
+        -------
+        None
+        """
+        self.p_box_width = width
+        self.__tables = None
+
+    def __p_box_tables(self, encrypt):
+        """
+        Get P or P_I as integer rows and lookup tables.
+
+        The rows and tables are rebuilt whenever P or P_I is replaced.
+
+        Parameters
+        ----------
+        encrypt : boolean
+            True for P and False for P_I
+
+        Returns
+        -------
+        tuple
+            the integer rows and the lookup tables (None if not compiled)
+        """
+        c = self.__tables
+        if c == None or c[0] is not self.P or c[1] is not self.P_I:
+            P = self.matrix_to_rows(self.P)
+            P_I = self.matrix_to_rows(self.P_I)
+            if self.p_box_width == None:
+                T, T_I = None, None
+            else:
+                T = self.rows_tables(P, self.p_box_width)
+                T_I = self.rows_tables(P_I, self.p_box_width)
+            c = (self.P, self.P_I, (P, T), (P_I, T_I))
+            self.__tables = c
+        return c[2] if encrypt else c[3]
 
     def p_box_multiplication(self, data, encrypt):
         """
@@ -125,16 +180,51 @@ class PBox:
         encrypt : boolean
             True in encryption and False if decryption
         """
-        if encrypt:
-            res_data = self.matrix_mul_row_column(data, self.P)
+        R, T = self.__p_box_tables(encrypt)
+        x = self.binary_to_int(data)
+        if T == None:
+            res_data = self.rows_mul_vector(x, R)
         else:
-            res_data = self.matrix_mul_row_column(data, self.P_I)
-        return res_data
+            mask = 2**self.p_box_width-1
+            res_data = 0
+            for t in T:
+                res_data ^= t[x & mask]
+                x >>= self.p_box_width
+        return self.int_to_binary(res_data, len(data))
+
+    def p_box_multiplication_many(self, data, encrypt):
+        """
+        Preform multiplication of many blocks on P or P_I.
+
+        Parameters
+        ----------
+        data : list of int or list of list of int
+            the blocks to permutate, as integers or binary lists
+        encrypt : boolean
+            True in encryption and False if decryption
+
+        Returns
+        -------
+        list of int or list of list of int
+            the permutated blocks in the same form as data
+        """
+        R, T = self.__p_box_tables(encrypt)
+        width = self.p_box_width or 8
+
+        if len(data) == 0 or type(data[0]) == int:
+            return self.rows_mul_vectors(data, R, T, width)
+
+        res_data = self.rows_mul_vectors([self.binary_to_int(d) for d in data], R, T, width)
+        return [self.int_to_binary(d, self.block_len) for d in res_data]
 
     def find_attackable_lambda(self, N, k):
         """
         Faster way to find attackable lambda.
 
+        M = [[L, R], [0, Rk]] with L and Rk invertible is always
+        invertible, with M^-1 = [[L^-1, L^-1 R Rk^-1], [0, Rk^-1]], so
+        both are built from the inverses of the blocks.
+
         Parameters
         ----------
         N : int
@@ -144,7 +234,8 @@ class PBox:
 
         Returns
         -------
-        list of list of int
+        tuple of list of list of int
+            M and its inverse
 
         Raises
         ------
@@ -156,32 +247,38 @@ class PBox:
         elif k <= 0:
             raise ValueError('K cannot be less than or equal to 0.')
 
-        while True:
-            M = [[0 for _ in range(N)] for _ in range(N)]
-
-            l_Mi = []
-            while l_Mi == []:
-                l_M = [[random.randint(0, 1) for _ in range(N-k)] for _ in range(N-k)]
-                l_Mi = self.calculate_inverse(l_M)
-
-            r_Mi = []
-            while r_Mi == []:
-                r_M = [[random.randint(0, 1) for _ in range(k)] for _ in range(k)]
-                r_Mi = self.calculate_inverse(r_M)
-
-            right = [[random.randint(0, 1) for _ in range(k)] for _ in range(N-k)]
-
-            for i in range(N):
-                for j in range(N):
-                    if i < N-k and j < N-k:
-                        M[i][j] = l_M[i][j]
-                    elif i < N-k and j >= N-k:
-                        M[i][j] = right[i][j-(N-k)]
-                    elif i >= N-k and j >= N-k:
-                        M[i][j] = r_M[i-(N-k)][j-(N-k)]
-                    else:
-                        continue
-            M_i = self.calculate_inverse(M)
-            if M_i != []:
-                break
-        return M, M_i
+        n = N-k
+        L, L_I = self.random_invertible_rows(n)
+        Rk, Rk_I = self.random_invertible_rows(k)
+        right = [random.getrandbits(k) for _ in range(n)]
+
+        M = [l | r << n for l, r in zip(L, right)] + [r << n for r in Rk]
+        # L^-1 R Rk^-1
+        right_I = self.rows_mul_vectors(self.rows_mul_vectors(L_I, right), Rk_I)
+        M_I = [l | r << n for l, r in zip(L_I, right_I)] + [r << n for r in Rk_I]
+        return self.rows_to_matrix(M, N), self.rows_to_matrix(M_I, N)
+
+    def find_attackable_lambdas(self, N, k, count):
+        """
+        Find many attackable lambda.
+
+        Parameters
+        ----------
+        N : int
+            total size of the matrix
+        k : int
+            size of the k part
+        count : int
+            number of lambda
+
+        Returns
+        -------
+        list of tuple of list of list of int
+            count pairs of M and its inverse
+
+        Raises
+        ------
+        ValueError
+            If the N and k combination is not correct
+        """
+        return [self.find_attackable_lambda(N, k) for _ in range(count)]
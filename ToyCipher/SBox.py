@@ -2,6 +2,8 @@
 
 """SBox used in the ToyCipher class."""
 
+from Attack.Operations import Operations
+
 import random
 
 
@@ -19,6 +21,8 @@ class SBox:
     -------
     substitution_box(block_len):
         Generate the substitution box
+    linear_substitution_box(block_len, k):
+        Generate a substitution box linear in XOR and Ring
     preform_data_substitution(data, encrypt):
         Preform substitution
     """
@@ -51,7 +55,9 @@ class SBox:
         tuple of S and S_I
             the encryption (S) and decryption (S_I) substitution box
         """
-        if S == None:
+        if S == None and self.k != None:
+            return self.linear_substitution_box(block_len, self.k)
+        elif S == None:
             if block_len%self.num_of_gamma != 0:
                 raise ValueError("Num of gamma is not dividable with length of P.")
 
@@ -79,6 +85,42 @@ class SBox:
 
             return S, S_I
 
+    def linear_substitution_box(self, block_len, k):
+        """
+        Create a substitution box linear in XOR and Ring.
+
+        The S box is a matrix drawn from the matrices linear in both XOR
+        and the Ring of the block. Ring mixes the bits of every gamma, so
+        the S boxes of many gamma can not be drawn one at a time and only
+        a single gamma is supported.
+
+        Parameters
+        ----------
+        block_len : int
+            the size of the block
+        k : int
+            size of the modifying matrix of the block
+
+        Returns
+        -------
+        tuple of S and S_I
+            the encryption (S) and decryption (S_I) substitution box
+
+        Raises
+        ------
+        ValueError
+            if num of gamma is not 1
+        """
+        if self.num_of_gamma != 1:
+            raise ValueError("S boxes linear in Ring are only drawn for a single gamma.")
+
+        r = Operations(N=block_len, k=k, table=False)
+        X = range(2**block_len)
+        R, R_I = r.random_linear_rows()
+        S = [{x: y for x, y in zip(X, r.rows_mul_vectors(X, R))}]
+        S_I = [{x: y for x, y in zip(X, r.rows_mul_vectors(X, R_I))}]
+        return S, S_I
+
     def preform_data_substitution(self, data, encrypt, section):
         """
         Preform the substitution.
@@ -2,19 +2,18 @@
 
 """Create a ToyCipher."""
 
-from Attack.Matrix import Matrix
+from Attack.BitMatrix import BitMatrix
 from .SBox import SBox
 from .PBox import PBox
 from .Key import Key
 
 from pathlib import Path
 import random
-import copy
 import os
 import re
 
 
-class ToyCipher(Matrix, SBox, PBox, Key):
+class ToyCipher(BitMatrix, SBox, PBox, Key):
     """
     A class to represent the ToyCipher.
 
@@ -26,6 +25,8 @@ class ToyCipher(Matrix, SBox, PBox, Key):
         the length of the block
     rounds : int
         how many rounds the cipher has
+    k : int or None
+        size of the modifying matrix the boxes are attackable with
 
     Methods
     -------
@@ -37,20 +38,34 @@ class ToyCipher(Matrix, SBox, PBox, Key):
         Load the P box from file
     __load_s_box(orig_indent, content, box):
         Load the S and Key box from file
-    __preform_splitted_substitution(data, encryption):
-        Preform data substitution using multiple gamma
     save_cipher(file_name):
         Save the current cipher to a file in position file_name
     load_cipher(file_name):
         Load a cipher in the path file_name
+    compile_cipher():
+        Build the integer tables of the boxes
+    __compiled():
+        Get the integer tables, rebuilt if a box was replaced
+    __lookup_int(x, T):
+        Look up every gamma of an integer block and XOR the results
+    encrypt_int(data, key):
+        encrypt an integer block
+    decrypt_int(data, key):
+        decrypt an integer block
     encrypt(data_t, key_t):
         encrypt the data
     decrypt(data_t, key_t):
         decrypt the data
+    key_schedule(key_t):
+        get every round key
+    encrypt_many(data, key_t):
+        encrypt many blocks with one key
+    encrypt_many_keys(data, keys):
+        encrypt the same blocks with many keys
     """
 
-    # TODO: Initiate a parameter to make the cipher 100% attackable (generating attackable S and P boxes).
-    def __init__(self, block_len=3, rounds=1, num_of_gamma=1):
+    # TODO: Generate attackable S and P boxes for many gamma when k is set.
+    def __init__(self, block_len=3, rounds=1, num_of_gamma=1, k=None):
         """
         Init default parameters.
 
@@ -60,11 +75,26 @@ class ToyCipher(Matrix, SBox, PBox, Key):
             the length of the block
         rounds : int
             how many rounds the cipher has
+        num_of_gamma : int
+            number of S boxes the block is split into
+        k : int or None
+            if set, the S and P boxes are drawn linear in XOR and in the
+            Ring of size k of the block, with a single gamma only
+
+        Raises
+        ------
+        ValueError
+            if k is set and num of gamma is not 1
         """
+        if k != None and num_of_gamma != 1:
+            raise ValueError("Attackable boxes are only drawn for a single gamma.")
+        self.k = k
         self.num_of_gamma = num_of_gamma
         self.block_len = block_len
         self.rounds = rounds
+        self.__cipher = None
         super().__init__()
+        self.compile_cipher()
 
     def __binary(self, b):
         """
@@ -210,27 +240,6 @@ class ToyCipher(Matrix, SBox, PBox, Key):
         else:
             return i, S, S_I
 
-    def __preform_splitted_substitution(self, data, encryption):
-        """
-        Preform data substitution using n gamma.
-
-        Parameters
-        ----------
-        data : list of int
-            the data to preform the substitution on
-        encryption : bool
-            encryption or decryption
-
-        Returns
-        List of int
-            the data substituted
-        """
-        data_splitted = [data[x:x+int(self.block_len/self.num_of_gamma)] for x in range(0, self.block_len, int(self.block_len/self.num_of_gamma))]
-        data_tmp = []
-        for i in range(self.num_of_gamma):
-            data_tmp.append(self.preform_data_substitution(data_splitted[i], encryption, i))
-        return [d for sd in data_tmp for d in sd]
-
     def save_cipher(self, file_name, hard=False, only_P=False):
         """
         Save the current cipher to a text file.
@@ -325,6 +334,162 @@ class ToyCipher(Matrix, SBox, PBox, Key):
 
         # Convert the column len to octal representation
         self.block_len = len(self.P)
+        self.compile_cipher()
+
+    def compile_cipher(self):
+        """
+        Build the integer tables of the boxes.
+
+        A round substitutes every gamma and permutates the block, and the
+        P box is linear, so both are fused into one table per gamma,
+        TE[v] = P(S(v) << shift), whose outputs are XORed together.
+        Decryption permutates before substituting, so the rounds are
+        rewritten over P_I(x) with TD[v] = P_I(S_I(v) << shift) and the
+        round keys permutated by P_I. The key box becomes the lists Kr and
+        KIr of the next and previous round key as integers. The boxes are
+        validated here once instead of on every block.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            if a box is not a permutation of the right size
+        """
+        length = self.block_len//self.num_of_gamma
+        if len(self.S) != self.num_of_gamma or len(self.S_I) != self.num_of_gamma:
+            raise ValueError("Number of S-boxes is not num of gamma.")
+        S = []
+        S_I = []
+        for s, s_i in zip(self.S, self.S_I):
+            S.append([s.get(x) for x in range(2**length)])
+            S_I.append([s_i.get(x) for x in range(2**length)])
+            if set(S[-1]) != set(range(2**length)) or \
+                    any(S_I[-1][y] != x for x, y in enumerate(S[-1])):
+                raise ValueError("S-box is not a permutation of {} bits.".format(length))
+
+        K = [self.K.get(x) for x in range(2**self.block_len)]
+        if set(K) != set(range(2**self.block_len)) or \
+                any(self.K_I.get(y) != x for x, y in enumerate(K)):
+            raise ValueError("K-box is not a permutation of {} bits.".format(self.block_len))
+
+        # The round keys are stored as reversed binary lists
+        rev = [self.binary_to_int(self.int_to_binary(x, self.block_len)[::-1])
+               for x in range(2**self.block_len)]
+        Kr = [rev[K[x]] for x in range(2**self.block_len)]
+        KIr = [self.K_I[rev[x]] for x in range(2**self.block_len)]
+
+        # Every S box moved to the bits of its gamma
+        S = [[v << i*length for v in S[i]] for i in range(self.num_of_gamma)]
+        S_I = [[v << i*length for v in S_I[i]] for i in range(self.num_of_gamma)]
+
+        P = self.matrix_to_rows(self.P)
+        P_I = self.matrix_to_rows(self.P_I)
+        TE = [self.rows_mul_vectors(s, P) for s in S]
+        TD = [self.rows_mul_vectors(s, P_I) for s in S_I]
+        # P_I of the previous round key
+        KIrP = self.rows_mul_vectors(KIr, P_I)
+
+        boxes = (self.P, self.P_I, self.S, self.S_I, self.K, self.K_I)
+        self.__cipher = (boxes, S, S_I, Kr, KIr, TE, TD, KIrP)
+
+    def __compiled(self):
+        """
+        Get the integer tables, rebuilt if a box was replaced.
+
+        Returns
+        -------
+        tuple
+            the tables built by compile_cipher
+        """
+        c = self.__cipher
+        if c == None:
+            self.compile_cipher()
+            return self.__cipher
+        P, P_I, S, S_I, K, K_I = c[0]
+        if P is not self.P or P_I is not self.P_I or S is not self.S or \
+                S_I is not self.S_I or K is not self.K or K_I is not self.K_I:
+            self.compile_cipher()
+            c = self.__cipher
+        return c
+
+    def __lookup_int(self, x, T):
+        """
+        Look up every gamma of an integer block and XOR the results.
+
+        Parameters
+        ----------
+        x : int
+            the block
+        T : list of list of int
+            one table per gamma, indexed by its bits of the block
+
+        Returns
+        -------
+        int
+        """
+        if len(T) == 1:
+            return T[0][x]
+        length = self.block_len//self.num_of_gamma
+        mask = 2**length-1
+        res = 0
+        for t in T:
+            res ^= t[x & mask]
+            x >>= length
+        return res
+
+    def encrypt_int(self, data, key):
+        """
+        Encrypt an integer block using an integer key.
+
+        The block and key are not validated.
+
+        Parameters
+        ----------
+        data : int
+            the block to encrypt
+        key : int
+            the key
+
+        Returns
+        -------
+        int
+        """
+        _, S, _, Kr, _, TE, _, _ = self.__compiled()
+        data ^= key
+        for _ in range(self.rounds):
+            key = Kr[key]
+            data = self.__lookup_int(data, TE) ^ key
+        return self.__lookup_int(data, S) ^ Kr[key]
+
+    def decrypt_int(self, data, key):
+        """
+        Decrypt an integer block using an integer key.
+
+        The block and key are not validated.
+
+        Parameters
+        ----------
+        data : int
+            the block to decrypt
+        key : int
+            the key
+
+        Returns
+        -------
+        int
+        """
+        _, _, S_I, Kr, KIr, _, TD, KIrP = self.__compiled()
+        for _ in range(self.rounds+1):
+            key = Kr[key]
+
+        data ^= key
+        for _ in range(self.rounds):
+            data = self.__lookup_int(data, TD) ^ KIrP[key]
+            key = KIr[key]
+        return self.__lookup_int(data, S_I) ^ KIr[key]
 
     def encrypt(self, data_t, key_t):
         """
@@ -349,34 +514,13 @@ class ToyCipher(Matrix, SBox, PBox, Key):
             when data or key is not list or string
             when the length of data or key is not correct
         """
-        data = copy.deepcopy(data_t)
-        key = copy.deepcopy(key_t)
-
         try:
-            self.__check_input(data, key)
+            self.__check_input(data_t, key_t)
         except Exception as e:
             raise e
 
-        if(type(data) == str):
-            data = [int(i) for i in data]
-
-        if(type(key) == str):
-            key = [int(i) for i in key]
-
-        data = self.xor_data_key(data, key)
-
-        for _ in range(self.rounds):
-            data = self.__preform_splitted_substitution(data, True)
-            data = self.p_box_multiplication(data, True)
-            key = self.new_key_round(key, True)
-            data = self.xor_data_key(data, key)
-
-        data = self.__preform_splitted_substitution(data, True)
-
-        key = self.new_key_round(key, True)
-        data = self.xor_data_key(data, key)
-
-        return data
+        data = self.encrypt_int(self.binary_to_int(data_t), self.binary_to_int(key_t))
+        return self.int_to_binary(data, self.block_len)
 
     def decrypt(self, data_t, key_t):
         """
@@ -401,34 +545,111 @@ class ToyCipher(Matrix, SBox, PBox, Key):
             when data or key is not list or string
             when the length of data or key is not correct
         """
-        data = copy.deepcopy(data_t)
-        key = copy.deepcopy(key_t)
-
         try:
-            self.__check_input(data, key)
+            self.__check_input(data_t, key_t)
         except Exception as e:
             raise e
 
-        if(type(data) == str):
-            data = [int(i) for i in data]
+        data = self.decrypt_int(self.binary_to_int(data_t), self.binary_to_int(key_t))
+        return self.int_to_binary(data, self.block_len)
+
+    def key_schedule(self, key_t):
+        """
+        Get every round key.
+
+        Parameters
+        ----------
+        key_t : list or string (binary) or int
+            the key
+
+        Returns
+        -------
+        list of int
+            the rounds+2 keys xored in encryption, in order
+
+        Raises
+        ------
+        ValueError
+            when the length of the key is not correct
+        """
+        if type(key_t) == int:
+            key = self.int_to_binary(key_t, self.block_len)
+        else:
+            key = [int(i) for i in key_t]
 
-        if(type(key) == str):
-            key = [int(i) for i in key]
+        if(len(key) != self.block_len):
+            raise ValueError('Key is not of correct size.')
 
+        keys = [key]
         for _ in range(self.rounds+1):
-            key = self.new_key_round(key, True)
+            keys.append(self.new_key_round(keys[-1], True))
+        return [self.binary_to_int(k) for k in keys]
 
-        data = self.xor_data_key(data, key)
-        key = self.new_key_round(key, False)
+    def encrypt_many(self, data, key_t):
+        """
+        Encrypt many blocks with one key.
 
-        data = self.__preform_splitted_substitution(data, False)
+        The blocks run through encrypt_many_keys, so the fused round
+        tables of compile_cipher are shared by every encryption.
 
-        data = self.xor_data_key(data, key)
+        Parameters
+        ----------
+        data : list of int or list of list of int
+            the blocks to encrypt, as integers or binary lists
+        key_t : list or string (binary) or int
+            the key
 
-        for _ in range(self.rounds):
-            data = self.p_box_multiplication(data, False)
-            data = self.__preform_splitted_substitution(data, False)
-            key = self.new_key_round(key, False)
-            data = self.xor_data_key(data, key)
+        Returns
+        -------
+        list of int or list of list of int
+            the encrypted blocks in the same form as data
+
+        Raises
+        ------
+        ValueError
+            when the length of the key is not correct
+        """
+        if type(key_t) == int:
+            key = self.int_to_binary(key_t, self.block_len)
+        else:
+            key = [int(i) for i in key_t]
 
-        return data
+        if(len(key) != self.block_len):
+            raise ValueError('Key is not of correct size.')
+
+        if len(data) == 0 or type(data[0]) == int:
+            return self.encrypt_many_keys(data, [self.binary_to_int(key)])[0]
+        X = self.encrypt_many_keys([self.binary_to_int(d) for d in data],
+                                   [self.binary_to_int(key)])[0]
+        return [self.int_to_binary(x, self.block_len) for x in X]
+
+    def encrypt_many_keys(self, data, keys):
+        """
+        Encrypt the same integer blocks with many integer keys.
+
+        Every key and block runs through the rounds as one batch, sharing
+        the integer tables of compile_cipher. The key schedule is looked
+        up in Kr once per key and round. The blocks and keys are not
+        validated.
+
+        Parameters
+        ----------
+        data : list of int
+            the blocks to encrypt
+        keys : list of int
+            the keys
+
+        Returns
+        -------
+        list of list of int
+            the encrypted blocks of every key
+        """
+        _, S, _, Kr, _, TE, _, _ = self.__compiled()
+        n = len(data)
+        X = [x ^ key for key in keys for x in data]
+        for _ in range(self.rounds):
+            keys = [Kr[key] for key in keys]
+            X = [self.__lookup_int(x, TE) ^ keys[i//n] for i, x in enumerate(X)]
+        keys = [Kr[key] for key in keys]
+        X = [self.__lookup_int(x, S) ^ keys[i//n] for i, x in enumerate(X)]
+        return [X[i*n:(i+1)*n] for i in range(len(keys))]
@@ -2,12 +2,18 @@
 
 """Tests for the Ring product, ToyCipher."""
 
+from Attack.BitMatrix import BitMatrix
+from Attack.HiddenSum import HiddenSum
+from Attack.Matrix import Matrix
 from Attack.Operations import Operations
+from Attack.Search import Search
+from Attack.TableCache import TableCache
 from ToyCipher.ToyCipher import ToyCipher
 
 import unittest
 import random
 import logging
+import tempfile
 
 
 class TestRingRules(unittest.TestCase):
@@ -32,6 +38,103 @@ class TestRingRules(unittest.TestCase):
                         """.format(a, b, b, a, N, k)
                     )
 
+    def test_ring_table(self):
+        """Test the ring table against computing the ring product."""
+        test_sizes = [
+            (3, 1),
+            (5, 2),
+            (6, 3)
+        ]
+
+        for N, k in test_sizes:
+            c = Operations(N=N, k=k)
+            r = Operations(N=N, k=k, table=False)
+            self.assertIs(c.table, Operations(N=N, k=k).table)
+            self.assertEqual(r.table, None)
+            for a in range(2**N):
+                for b in range(2**N):
+                    self.assertEqual(c.ring(a, b), r.ring(a, b))
+
+    def test_ring_bitmask(self):
+        """Test the bitmask ring product against the B_x product."""
+        test_sizes = [
+            (5, 1),
+            (7, 3),
+            (12, 4)
+        ]
+
+        for N, k in test_sizes:
+            c = Operations(N=N, k=k, table=False)
+            for _ in range(500):
+                a = random.getrandbits(N)
+                b = random.getrandbits(N)
+                aM_b = c.matrix_mul_row_column(c.int_to_binary(a, N), c.get_Bx(b))
+                self.assertEqual(
+                    c.ring(a, b),
+                    c.binary_to_int(aM_b) ^ b,
+                    "N: {}, k: {}, a: {}, b: {}".format(N, k, a, b)
+                )
+                self.assertEqual(c.dot(a, b), c.ring(a, b) ^ a ^ b)
+
+    def test_laws_vectorized(self):
+        """Test the ring laws on whole tables for larger sizes."""
+        test_sizes = [
+            (7, 3),
+            (8, 2)
+        ]
+
+        for N, k in test_sizes:
+            hs = Operations(N=N, k=k, table=False)
+            X = list(range(2**N))
+            table = hs.ring_outer(X, X)
+
+            # a o b == b o a
+            self.assertEqual(table, [list(col) for col in zip(*table)])
+
+            for a in X:
+                for b in random.sample(X, 8):
+                    # (a + b) o c == ((a o c) + (b o c)) + c
+                    a_o_c = table[a]
+                    b_o_c = table[b]
+                    self.assertEqual(
+                        hs.ring_many(a ^ b, X),
+                        [ac ^ bc ^ c for ac, bc, c in zip(a_o_c, b_o_c, X)],
+                        "N: {}, k: {}, a: {}, b: {}".format(N, k, a, b)
+                    )
+
+                    # (a.b).c == a.(b.c)
+                    self.assertEqual(
+                        hs.dot_many(hs.dot(a, b), X),
+                        hs.dot_many(a, hs.dot_many(b, X)),
+                        "N: {}, k: {}, a: {}, b: {}".format(N, k, a, b)
+                    )
+
+    def test_phi_map(self):
+        """Test the Phi map against the per position definition."""
+        test_sizes = [
+            (3, 1),
+            (5, 2),
+            (6, 3)
+        ]
+
+        for N, k in test_sizes:
+            hs = Operations(N=N, k=k)
+            for _ in range(3):
+                P = ToyCipher(block_len=N).P
+                r = [hs.phi_pos_a(a, P) for a in range(2**N)]
+                x = [hs.phi_pos_a_xor(a, P) for a in range(2**N)]
+                phi = [i for i in range(2**N)]
+                phi_inv = [i for i in range(2**N)]
+                for i in range(2**N):
+                    if r[i] != x[i]:
+                        phi[x[i]] = r[i]
+                        phi[r[i]] = x[i]
+                        for j in range(i+1, 2**N):
+                            if x[j] == r[i]:
+                                phi_inv[i], phi_inv[j] = phi_inv[j], phi_inv[i]
+                                break
+                self.assertEqual(hs.phi_map(P), (phi, phi_inv), "P: {}".format(P))
+
     def test_nondistribution(self):
         """Test non-distribution."""
         test_sizes = [
@@ -119,6 +222,47 @@ class TestRingRules(unittest.TestCase):
                             """.format(N, k, x, a, b)
                         )
 
+    def test_linear_rows(self):
+        """Test the matrices linear in XOR and Ring."""
+        for N, k in [(2, 1), (3, 1), (4, 1), (5, 2), (7, 2), (6, 3)]:
+            c = Operations(N=N, k=k)
+            X = range(2**N)
+            for _ in range(10):
+                R, R_I = c.random_linear_rows()
+                self.assertEqual(c.rows_mul(R, R_I), c.get_identity_rows(N))
+                self.assertTrue(HiddenSum(N=N, k=k).lambda_check(c.rows_to_matrix(R, N)))
+                f = c.rows_mul_vectors(X, R)
+                self.assertTrue(all(f[c.ring(x, y)] == c.ring(f[x], f[y]) for x in X for y in X))
+
+        # The whole group for k = 1
+        for N, size in [(3, 24), (4, 192)]:
+            c = Operations(N=N, k=1)
+            counts = {}
+            for _ in range(100*size):
+                R = tuple(c.random_linear_rows()[0])
+                counts[R] = counts.get(R, 0) + 1
+            self.assertEqual(len(counts), size)
+
+        # The whole group for k = 2, counted by brute force
+        for N, size in [(4, 192), (5, 1536)]:
+            c = Operations(N=N, k=2)
+            counts = {}
+            for _ in range(20*size):
+                R = tuple(c.random_linear_rows()[0])
+                counts[R] = counts.get(R, 0) + 1
+            self.assertEqual(len(counts), size)
+
+        # Every top left block keeping the dot product up to its radical
+        for N, k, size in [(6, 2, 72), (7, 3, 32)]:
+            c = Operations(N=N, k=k)
+            n = N-k
+            S = {tuple(r & (2**n-1) for r in c.random_linear_rows()[0][:n]) for _ in range(2000)}
+            self.assertEqual(len(S), size)
+
+        c = Operations(N=64, k=8, table=False)
+        R, R_I = c.random_linear_rows()
+        self.assertEqual(c.rows_mul(R, R_I), c.get_identity_rows(64))
+
     def test_dot_associativity(self):
         """Test associativity."""
         test_sizes = [
@@ -189,6 +333,345 @@ class TestRingRules(unittest.TestCase):
                         )
 
 
+class TestMatrix(unittest.TestCase):
+    """Testing the integer and binary conversions."""
+
+    def test_conversion(self):
+        """Test converting integers to binary and back."""
+        m = Matrix()
+        for l in [0, 1, 5, 12, 13, 64, 200]:
+            for _ in range(100):
+                i = random.getrandbits(l)
+                b = m.int_to_binary(i, l)
+                self.assertEqual(len(b), l)
+                self.assertEqual(b, [(i >> p) & 1 for p in range(l)])
+                self.assertEqual(m.binary_to_int(b), i)
+                self.assertEqual(m.binary_to_int(''.join(str(j) for j in b)), i)
+        self.assertEqual(m.int_to_binary(9, 2), [1, 0, 0, 1])
+        self.assertEqual(m.binary_to_int([1, 2, 1]), 5)
+        self.assertEqual(
+            m.ints_to_binary([0, 3, 6], 3),
+            [[0, 0, 0], [1, 1, 0], [0, 1, 1]]
+        )
+        self.assertEqual(m.binaries_to_int([[0, 0, 1], "11"]), [4, 3])
+
+
+class TestBitMatrix(unittest.TestCase):
+    """Testing the bit-packed matrices."""
+
+    def test_inverse(self):
+        """Test that the integer row inverse equal the list inverse."""
+        m = Matrix()
+        b = BitMatrix()
+        for n in [1, 3, 5, 8]:
+            for _ in range(50):
+                A = [[random.randint(0, 1) for _ in range(n)] for _ in range(n)]
+                self.assertEqual(
+                    b.calculate_inverse(A),
+                    m.calculate_inverse(A),
+                    "A: {}".format(A)
+                )
+
+    def test_inverse_m4ri(self):
+        """Test the Method of Four Russians inverse and product."""
+        m = Matrix()
+        b = BitMatrix()
+        for n in [3, 8, 33, 64]:
+            for _ in range(10):
+                R = [random.getrandbits(n) for _ in range(n)]
+                for k in [1, 3, None]:
+                    I = b.calculate_inverse_m4ri(R, k)
+                    self.assertEqual(
+                        b.rows_to_matrix(I, n) if I != [] else [],
+                        m.calculate_inverse(b.rows_to_matrix(R, n)),
+                        "R: {}, k: {}".format(R, k)
+                    )
+                    if I != []:
+                        self.assertEqual(
+                            b.rows_mul_m4ri(R, I, k),
+                            b.get_identity_rows(n)
+                        )
+
+    def test_inverses(self):
+        """Test inverting a stack of matrices at once."""
+        b = BitMatrix()
+        for n in [1, 3, 9, 40]:
+            As = [[[random.randint(0, 1) for _ in range(n)] for _ in range(n)] for _ in range(50)]
+            invertible, inverses = b.calculate_inverses(As)
+            for A, inv, I in zip(As, invertible, inverses):
+                self.assertEqual(I, b.calculate_inverse(A), "A: {}".format(A))
+                self.assertEqual(inv, I != [])
+
+    def test_random_invertible(self):
+        """Test that the sampled matrices are invertible with given inverse."""
+        b = BitMatrix()
+        for n in [1, 3, 8, 40]:
+            for _ in range(20):
+                R, R_I = b.random_invertible_rows(n)
+                self.assertEqual(b.rows_mul(R, R_I), b.get_identity_rows(n))
+        # Every element of GL(2, 2) is reachable
+        found = set(tuple(b.random_invertible_rows(2)[0]) for _ in range(300))
+        self.assertEqual(len(found), 6)
+
+    def test_mul_vector(self):
+        """Test that the integer row product equal the list product."""
+        b = BitMatrix()
+        for n in [1, 3, 5, 8]:
+            A = [[random.randint(0, 1) for _ in range(n)] for _ in range(n)]
+            R = b.matrix_to_rows(A)
+            for x in range(2**n):
+                self.assertEqual(
+                    b.rows_mul_vector(x, R),
+                    b.binary_to_int(b.matrix_mul_row_column(b.int_to_binary(x, n), A)),
+                    "A: {}, x: {}".format(A, x)
+                )
+
+    def test_mul_vectors(self):
+        """Test that the batch product equal the single product."""
+        b = BitMatrix()
+        for n in [1, 5, 8, 13, 32]:
+            R = [random.getrandbits(n) for _ in range(n)]
+            X = [random.getrandbits(n) for _ in range(200)]
+            for width in [4, 8]:
+                self.assertEqual(
+                    b.rows_mul_vectors(X, R, width=width),
+                    [b.rows_mul_vector(x, R) for x in X],
+                    "R: {}, width: {}".format(R, width)
+                )
+            A = b.rows_to_matrix(R)
+            B = [b.int_to_binary(x, n) for x in X]
+            self.assertEqual(
+                b.matrix_mul_rows_column(B, A),
+                [b.matrix_mul_row_column(x, A) for x in B]
+            )
+
+
+class TestHiddenSum(unittest.TestCase):
+    """Testing the hidden sum checks."""
+
+    def test_lambda_check(self):
+        """Test the unit vector lambda check against the exhaustive one."""
+        test_sizes = [
+            (3, 1),
+            (4, 2),
+            (5, 2)
+        ]
+
+        for N, k in test_sizes:
+            hs = HiddenSum(N=N, k=k)
+            c = ToyCipher(block_len=N)
+            found = 0
+            for _ in range(300):
+                P = c.find_attackable_lambda(N, k)[0]
+                linear = hs.lambda_check(P, exhaustive=True)
+                found += linear
+                self.assertEqual(hs.lambda_check(P), linear, "P: {}".format(P))
+            self.assertTrue(found > 0)
+            self.assertTrue(hs.lambda_check(c.get_identity(N)))
+
+    def test_lambda_GL_ring(self):
+        """Test the Ring elimination of lambda."""
+        for N, k in [(3, 1), (5, 2)]:
+            hs = HiddenSum(N=N, k=k)
+            c = ToyCipher(block_len=N)
+            I = c.get_identity(N)
+            self.assertEqual(hs.lambda_GL_ring(I), I)
+            self.assertEqual(hs.lambda_GL_ring([[0 for _ in range(N)] for _ in range(N)]), [])
+            for _ in range(20):
+                P = c.find_attackable_lambda(N, k)[0]
+                self.assertEqual(len(hs.lambda_GL_ring(P)), N)
+
+    def attackable(self, N, k, rounds=1, **kwargs):
+        """Build a HiddenSum on a cipher drawn attackable."""
+        return HiddenSum(N=N, k=k, t=ToyCipher(block_len=N, rounds=rounds, k=k), **kwargs)
+
+    def test_attack_many(self):
+        """Test decrypting many ciphers against attack."""
+        N, k = 5, 2
+        hs = self.attackable(N, k, rounds=2)
+        key = [random.randint(0, 1) for _ in range(N)]
+        hs.change_key(key)
+
+        C = list(range(2**N))
+        m = [hs.attack(c) for c in C]
+        self.assertEqual(hs.attack_many(C, table=False), m)
+        self.assertEqual(hs.attack_many(C), m)
+        self.assertEqual(list(hs.attack_table()), m)
+        self.assertEqual(hs.attack_many([hs.int_to_binary(c, N) for c in C[:4]]), m[:4])
+        self.assertEqual(hs.attack_many(C[:4], key, table=True), m[:4])
+        self.assertEqual(hs.t.encrypt_many(m, key), C)
+
+    def test_key_cache(self):
+        """Test that the M matrices of a key are cached."""
+        N, k = 5, 2
+        hs = self.attackable(N, k, key_cache_size=2)
+        hs.key_cache_clear()
+        key = [1, 0, 1, 1, 0]
+        M, zero = hs.create_M(key)
+        self.assertEqual(hs.key_state(key), (M, hs.calculate_inverse(M), zero))
+        self.assertEqual(hs.key_state("10110"), hs.key_state(13))
+        info = hs.key_cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 1))
+        hs.key_state(0)
+        hs.key_state(1)
+        hs.key_state(key)
+        self.assertEqual(hs.key_cache_info().misses, 4)
+        hs.key_cache_clear()
+        self.assertEqual(hs.key_cache_info().currsize, 0)
+
+    def test_precompute_keys(self):
+        """Test the precomputed keys against calculating M for every key."""
+        N, k = 5, 2
+        hs = self.attackable(N, k, rounds=2)
+        m = {key: hs.attack_many(range(2**N), key, table=False) for key in range(2**N)}
+
+        for keys, processes in [(None, 1), (range(0, 2**N, 3), 2)]:
+            hs.key_cache_clear()
+            keys = range(2**N) if keys == None else keys
+            self.assertEqual(hs.precompute_keys(keys, processes), len(keys))
+            for key in keys:
+                self.assertEqual(hs.attack_many(range(2**N), key, table=False), m[key])
+            self.assertEqual(hs.key_cache_info().misses, 0)
+
+    def test_recover_key(self):
+        """Test key recovery against checking every key."""
+        N, k = 6, 2
+        hs = self.attackable(N, k, rounds=2)
+        t = hs.t
+        for pairs, method in [(24, 'model'), (2, 'sweep')]:
+            key = random.getrandbits(N)
+            M = random.sample(range(2**N), pairs)
+            C = t.encrypt_many(M, key)
+            keys = [t.int_to_binary(i, N) for i in range(2**N) if t.encrypt_many(M, i) == C]
+            self.assertIn(t.int_to_binary(key, N), keys)
+            self.assertEqual(hs.recover_key(list(zip(M, C))), keys)
+            self.assertEqual(hs.recovery_stats['method'], method)
+            if method == 'model':
+                self.assertEqual(hs.recovery_stats['index_encryptions'], 2**N)
+                self.assertGreaterEqual(hs.recovery_stats['encryptions'], 2**N)
+                hs.recover_key(list(zip(M, C)))
+                self.assertEqual(hs.recovery_stats['index_encryptions'], 0)
+        self.assertRaises(ValueError, hs.recover_key, [])
+
+    def test_attackable_cipher(self):
+        """Test attacking ciphers drawn attackable."""
+        for N, k, rounds in [(3, 1, 1), (5, 2, 3), (9, 2, 2)]:
+            for _ in range(5):
+                t = ToyCipher(block_len=N, rounds=rounds, k=k)
+                self.assertEqual(t.calculate_inverse(t.P), t.P_I)
+                hs = HiddenSum(N=N, k=k, t=t)
+                key = random.getrandbits(N)
+                C = t.encrypt_many(list(range(2**N)), key)
+                self.assertEqual(hs.attack_many(C, key), list(range(2**N)))
+        self.assertRaises(ValueError, ToyCipher, block_len=6, num_of_gamma=2, k=2)
+
+    def test_S_attackability(self):
+        """Test the S box check against the Ring of the whole block."""
+        for N, k, num_of_gamma, ciphers in [(3, 1, 1, 20), (6, 2, 2, 20), (6, 3, 2, 20), (8, 2, 2, 3)]:
+            hs = HiddenSum(N=N, k=k)
+            r = Operations(N=N, k=k)
+            length = N//num_of_gamma
+            X = range(2**length)
+            # Adds the lowest bit of the last gamma to its highest bit
+            shear = {x: x ^ (x & 1) << (length-1) for x in X}
+            boxes = [[{x: x for x in X} for _ in range(num_of_gamma)]]
+            if length > k:
+                boxes.append(boxes[0][1:] + [shear])
+            boxes += [ToyCipher(block_len=N, num_of_gamma=num_of_gamma).S for _ in range(ciphers)]
+            for S in boxes:
+                S_X = [sum(S[i][(x >> i*length) & (2**length-1)] << i*length
+                           for i in range(num_of_gamma)) for x in range(2**N)]
+                differ = 0
+                for x in range(2**N):
+                    for y in range(2**N):
+                        differ |= S_X[r.ring(x, y)] ^ r.ring(S_X[x], S_X[y])
+                failing = hs.failing_S_boxes(S, N, k, num_of_gamma)
+                self.assertEqual(failing == [], differ == 0, "S: {}".format(S))
+                for i in failing:
+                    self.assertTrue((differ >> i*length) & (2**length-1))
+                if failing != []:
+                    self.assertRaises(ValueError, hs.check_S_attackability, S, N, k, num_of_gamma)
+            self.assertEqual(hs.failing_S_boxes(boxes[0], N, k, num_of_gamma), [])
+            if length > k:
+                self.assertEqual(hs.failing_S_boxes(boxes[1], N, k, num_of_gamma), [])
+
+    def test_multi_gamma_cipher(self):
+        """Test attacking a cipher of many gamma end to end."""
+        N, k, num_of_gamma = 6, 2, 2
+        length = N//num_of_gamma
+        X = range(2**length)
+        S = [{x: x for x in X}, {x: x ^ (x & 1) << (length-1) for x in X}]
+        for _ in range(5):
+            t = ToyCipher(block_len=N, rounds=2, num_of_gamma=num_of_gamma)
+            self.assertRaises(ValueError, HiddenSum, N=N, k=k, t=t)
+            t.substitution_box(N, S)
+            t.permutation_box(t.rows_to_matrix(Operations(N=N, k=k).random_linear_rows()[0]))
+            hs = HiddenSum(N=N, k=k, t=t)
+            key = random.getrandbits(N)
+            M = list(range(2**N))
+            C = t.encrypt_many(M, key)
+            self.assertEqual([t.decrypt_int(c, key) for c in C], M)
+            self.assertEqual(hs.attack_many(C, key), M)
+
+
+class TestSearch(unittest.TestCase):
+    """Testing the search for attackable ciphers."""
+
+    def test_run(self):
+        """Test that the hits are attackable and saved."""
+        with tempfile.TemporaryDirectory() as d:
+            s = Search(N=3, k=1, processes=1, batch=64)
+            hits = s.run(hits=1, file_name=d + "/hit_{}.txt", max_candidates=10**6)
+            self.assertEqual(len(hits), 1)
+            HiddenSum(N=3, k=1, t=hits[0])
+
+            t = ToyCipher(block_len=3)
+            t.load_cipher(d + "/hit_0.txt")
+            self.assertEqual((t.P, t.S), (hits[0].P, hits[0].S))
+
+    def test_rejections(self):
+        """Test the statistics of a search stopped by max_candidates."""
+        s = Search(N=3, k=1, processes=1, batch=16)
+        hits = s.run(hits=10**6, max_candidates=64)
+        self.assertEqual(s.candidates, 64)
+        self.assertEqual(sum(s.rejections.values()) + len(hits), 64)
+        self.assertTrue(all(',' not in reason for reason in s.rejections))
+        self.assertEqual(s.eta(10**6, 64), 0)
+        self.assertIn("candidates: 64", s.report())
+
+
+class TestTableCache(unittest.TestCase):
+    """Testing the on-disk table cache."""
+
+    def test_store_load(self):
+        """Test storing, loading and evicting tables."""
+        with tempfile.TemporaryDirectory() as d:
+            cache = TableCache(d, max_bytes=3000)
+            self.assertEqual(cache.load('a', 'H'), None)
+            self.assertFalse(cache.exists('a', 'H'))
+            cache.store('a', list(range(1000)), 'H')
+            self.assertTrue(cache.exists('a', 'H'))
+            self.assertFalse(cache.exists('a', 'B'))
+            self.assertEqual(cache.load('a', 'H').tolist(), list(range(1000)))
+            cache.store('b', list(range(1000)), 'H')
+            self.assertEqual(cache.load('a', 'H'), None)
+            self.assertEqual(cache.load('b', 'H')[999], 999)
+
+    def test_operations(self):
+        """Test the ring table and Phi map through the cache."""
+        with tempfile.TemporaryDirectory() as d:
+            cache = TableCache(d)
+            c = Operations(N=4, k=2, table=True, cache=cache)
+            self.assertEqual(
+                cache.load('ring_N4_k2', 'B').tolist(),
+                [c.ring(a, b) for a in range(16) for b in range(16)]
+            )
+            P = ToyCipher(block_len=4).P
+            phi = c.phi_map(P)
+            self.assertEqual(c.phi_map(P), phi)
+            self.assertEqual(Operations(N=4, k=2).phi_map(P), phi)
+
+
 class TestToyCipher(unittest.TestCase):
     """Testing the ToyCipher."""
 
@@ -212,6 +695,148 @@ class TestToyCipher(unittest.TestCase):
                     "msg: {}, dec: {}, key: {}".format(msg, dec, key)
                 )
 
+    def test_p_box_many(self):
+        """Test that the batch P-box equal the single block P-box."""
+        c = ToyCipher(block_len=7)
+        data = [c.int_to_binary(i, 7) for i in range(2**7)]
+        for encrypt in [True, False]:
+            self.assertEqual(
+                c.p_box_multiplication_many(data, encrypt),
+                [c.p_box_multiplication(d, encrypt) for d in data]
+            )
+            self.assertEqual(
+                c.p_box_multiplication_many(list(range(2**7)), encrypt),
+                [c.binary_to_int(c.p_box_multiplication(d, encrypt)) for d in data]
+            )
+
+    def test_linear_s_box(self):
+        """Test that the S boxes drawn with k are attackable."""
+        hs = HiddenSum()
+        for N, k in [(3, 1), (6, 2), (6, 3), (9, 2)]:
+            for _ in range(5):
+                c = ToyCipher(block_len=N, k=k)
+                self.assertEqual(hs.failing_S_boxes(c.S, N, k, 1), [])
+                self.assertEqual(sorted(c.S[0].values()), list(range(2**N)))
+                self.assertEqual({y: x for x, y in c.S[0].items()}, c.S_I[0])
+        self.assertRaises(ValueError, ToyCipher, block_len=6, num_of_gamma=2, k=2)
+
+    def test_linear_p_box(self):
+        """Test that the P boxes drawn with k cover the whole group."""
+        for N, size in [(4, 192), (5, 1536)]:
+            c = ToyCipher(block_len=N, k=2)
+            o = Operations(N=N, k=2)
+            X = range(2**N)
+            P = {tuple(o.matrix_to_rows(c.permutation_box()[0])) for _ in range(20*size)}
+            self.assertEqual(len(P), size)
+            for p in P:
+                f = o.rows_mul_vectors(X, list(p))
+                self.assertTrue(all(f[o.ring(x, y)] == o.ring(f[x], f[y]) for x in X for y in X))
+
+    def test_encrypt_many(self):
+        """Test that the batch encryption equal the single block encryption."""
+        for num_of_gamma, rounds in [(1, 1), (2, 3)]:
+            c = ToyCipher(block_len=6, rounds=rounds, num_of_gamma=num_of_gamma)
+            data = [c.int_to_binary(i, 6) for i in range(2**6)]
+            for _ in range(10):
+                key = [random.randint(0, 1) for _ in range(6)]
+                enc = [c.encrypt(d, key) for d in data]
+                self.assertEqual(c.encrypt_many(data, key), enc)
+                self.assertEqual(
+                    c.encrypt_many(list(range(2**6)), c.binary_to_int(key)),
+                    [c.binary_to_int(e) for e in enc]
+                )
+
+    def test_encrypt_many_keys(self):
+        """Test that encrypting with many keys equal one key at a time."""
+        for num_of_gamma, rounds in [(1, 1), (2, 3)]:
+            c = ToyCipher(block_len=6, rounds=rounds, num_of_gamma=num_of_gamma)
+            data = random.sample(range(2**6), 7)
+            keys = random.sample(range(2**6), 10)
+            self.assertEqual(c.encrypt_many_keys(data, keys), [c.encrypt_many(data, key) for key in keys])
+            self.assertEqual(c.encrypt_many_keys([], keys), [[] for _ in keys])
+
+    def test_attackable_lambda(self):
+        """Test the block inverse of the attackable lambda."""
+        c = ToyCipher(block_len=5)
+        for N, k in [(5, 2), (3, 3), (40, 7)]:
+            for M, M_I in c.find_attackable_lambdas(N, k, 10):
+                self.assertEqual(c.calculate_inverse(M), M_I)
+                self.assertEqual([row[:N-k] for row in M[N-k:]], [[0]*(N-k) for _ in range(k)])
+        self.assertRaises(ValueError, c.find_attackable_lambda, 3, 4)
+
+    def test_encrypt_int(self):
+        """Test the integer encryption against the binary list encryption."""
+        for num_of_gamma, rounds in [(1, 1), (2, 3)]:
+            c = ToyCipher(block_len=6, rounds=rounds, num_of_gamma=num_of_gamma)
+            for _ in range(2):
+                for _ in range(50):
+                    data = random.getrandbits(6)
+                    key = random.getrandbits(6)
+                    enc = c.encrypt_int(data, key)
+                    self.assertEqual(
+                        c.int_to_binary(enc, 6),
+                        c.encrypt(c.int_to_binary(data, 6), c.int_to_binary(key, 6))
+                    )
+                    self.assertEqual(c.decrypt_int(enc, key), data)
+                # Replaced boxes are compiled again
+                c.S, c.S_I = c.substitution_box(6)
+                c.P, c.P_I = c.permutation_box()
+
+        c.S = [dict(c.S[0]), c.S[1]]
+        c.S[0][0] = c.S[0][1]
+        self.assertRaises(ValueError, c.compile_cipher)
+
+    def test_fused_tables(self):
+        """Test the fused tables against the separate boxes."""
+        N, num_of_gamma, rounds = 6, 2, 3
+        c = ToyCipher(block_len=N, rounds=rounds, num_of_gamma=num_of_gamma)
+
+        def substitute(data, encrypt):
+            return [b for i in range(num_of_gamma) for b in
+                    c.preform_data_substitution(data[i*3:i*3+3], encrypt, i)]
+
+        with tempfile.TemporaryDirectory() as d:
+            c.save_cipher(d + "/cipher.txt")
+            loaded = ToyCipher(block_len=N, rounds=rounds, num_of_gamma=num_of_gamma)
+            loaded.load_cipher(d + "/cipher.txt")
+
+        for _ in range(100):
+            data = [random.randint(0, 1) for _ in range(N)]
+            key = [random.randint(0, 1) for _ in range(N)]
+            enc = c.xor_data_key(list(data), key)
+            for _ in range(rounds):
+                enc = c.p_box_multiplication(substitute(enc, True), True)
+                key = c.new_key_round(key, True)
+                enc = c.xor_data_key(enc, key)
+            key = c.new_key_round(key, True)
+            enc = c.xor_data_key(substitute(enc, True), key)
+            for _ in range(rounds+1):
+                key = c.new_key_round(key, False)
+
+            self.assertEqual(c.encrypt(data, key), enc)
+            self.assertEqual(loaded.encrypt(data, key), enc)
+            self.assertEqual(c.decrypt(enc, key), data)
+
+    def test_p_box_tables(self):
+        """Test the P-box lookup tables against the matrix product."""
+        for bl in [3, 12]:
+            c = ToyCipher(block_len=bl)
+            for width in [None, 4, 8]:
+                c.compile_p_box(width)
+                for i in range(2**bl):
+                    d = c.int_to_binary(i, bl)
+                    self.assertEqual(
+                        c.p_box_multiplication(d, True),
+                        c.matrix_mul_row_column(d, c.P)
+                    )
+                    self.assertEqual(
+                        c.p_box_multiplication(d, False),
+                        c.matrix_mul_row_column(d, c.P_I)
+                    )
+            c.P, c.P_I = c.permutation_box()
+            d = c.int_to_binary(1, bl)
+            self.assertEqual(c.p_box_multiplication(d, True), c.P[0])
+
     def test_malformed_data(self):
         """Test so malformed input is catched."""
         for i in range(100):